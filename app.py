@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+import shutil
 import tempfile
 from utils.batch_processor import BatchProcessor
 
@@ -84,6 +85,13 @@ def main():
             help="Сколько копий создать для каждого загруженного архива"
         )
         
+        # Скорость сжатия
+        fast_mode = st.checkbox(
+            "⚡ Быстрое сжатие",
+            value=False,
+            help="Архивы копий сжимаются быстрее, но получаются немного больше"
+        )
+        
         st.markdown("---")
         
         # Информация о том, что будет создано
@@ -99,7 +107,7 @@ def main():
         
         with col_btn2:
             if st.button("🚀 Создать дубликаты", type="primary", use_container_width=True):
-                process_archives(uploaded_files, copies_count, domain_zone)
+                process_archives(uploaded_files, copies_count, domain_zone, fast_mode)
     else:
         st.warning("⚠️ Загрузите архивы для начала работы")
     
@@ -108,7 +116,7 @@ def main():
         display_results()
 
 
-def process_archives(uploaded_files, copies_count, domain_zone):
+def process_archives(uploaded_files, copies_count, domain_zone, fast_mode=False):
     """Обработка загруженных архивов"""
     
     # Создаем временную директорию для загруженных файлов
@@ -126,15 +134,17 @@ def process_archives(uploaded_files, copies_count, domain_zone):
         
         for idx, uploaded_file in enumerate(uploaded_files):
             file_path = os.path.join(temp_input_dir, uploaded_file.name)
+            # Пишем потоково блоками по 1 МБ, не собирая весь файл в один буфер
+            uploaded_file.seek(0)
             with open(file_path, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
+                shutil.copyfileobj(uploaded_file, f, length=1024 * 1024)
             archive_paths.append(file_path)
             
             progress = (idx + 1) / len(uploaded_files) * 0.1  # 10% на загрузку
             progress_bar.progress(progress)
         
         # Обработка архивов
-        processor = BatchProcessor()
+        processor = BatchProcessor(fast_mode=fast_mode)
         
         progress_info = {
             'current': 0,
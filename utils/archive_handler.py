@@ -1,16 +1,123 @@
 import os
+import logging
 import zipfile
 import rarfile
 import shutil
-from typing import Optional, List
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple, Callable
 import tempfile
 
 
+logger = logging.getLogger(__name__)
+
+# Пул буферов для копирования файлов в архивы (общий для всех потоков)
+_buffer_pool: List[bytearray] = []
+_buffer_pool_lock = threading.Lock()
+
+
+def _acquire_buffer(size: int) -> bytearray:
+    """Получение буфера из пула (или создание нового)"""
+    with _buffer_pool_lock:
+        if _buffer_pool:
+            return _buffer_pool.pop()
+    return bytearray(size)
+
+
+def _release_buffer(buffer: bytearray) -> None:
+    """Возврат буфера в пул для повторного использования"""
+    with _buffer_pool_lock:
+        _buffer_pool.append(buffer)
+
+
+def iter_files(directory: str, rel_dir: str = ''):
+    """
+    Рекурсивный обход файлов директории через os.scandir
+    
+    Порядок файлов тот же, что у os.walk (сначала файлы директории, затем
+    поддиректории); ссылки на директории не раскрываются. Тип записи берется
+    из DirEntry без отдельного stat, stat вызывается один раз на файл.
+    
+    Yields:
+        (относительный путь, полный путь, os.stat_result или None, если stat
+         не удался - например, для битой ссылки)
+    """
+    subdirs = []
+    with os.scandir(os.path.join(directory, rel_dir)) as entries:
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(rel_path)
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                # Решение о таком файле принимает вызывающий код - обход продолжается
+                st = None
+            yield rel_path, entry.path, st
+    
+    for rel_path in subdirs:
+        yield from iter_files(directory, rel_path)
+
+
 class ArchiveHandler:
     """Обработчик архивов (ZIP, RAR)"""
     
-    def __init__(self):
-        """Инициализация обработчика"""
+    # Размер буфера для потокового копирования файлов в архив
+    COPY_BUFFER_SIZE = 1024 * 1024
+    
+    # Порог свободного места, ниже которого временные копии удаляются сразу
+    LOW_DISK_SPACE_BYTES = 512 * 1024 * 1024
+    
+    # Каталог в оперативной памяти (tmpfs) для временных файлов, если доступен
+    RAM_TEMP_DIR = '/dev/shm'
+    
+    # Во сколько раз свободное место в RAM_TEMP_DIR должно превышать оценку объема:
+    # оценка не учитывает переписанные файлы копий (новые inode вместо жестких ссылок)
+    RAM_TEMP_SPACE_FACTOR = 2
+    
+    # Остаток свободного места, при котором ФС считается заполненной (ENOSPC)
+    OUT_OF_SPACE_BYTES = 16 * 1024 * 1024
+    
+    # Минимальное число файлов в ZIP, начиная с которого распаковка идет в несколько потоков
+    PARALLEL_EXTRACT_MIN_FILES = 64
+    
+    # Уровень сжатия zlib для архивов копий в быстром режиме
+    FAST_COMPRESSLEVEL = 1
+    
+    # Уже сжатые форматы - в архивы копий кладутся без повторного сжатия
+    STORED_EXTENSIONS = {
+        '.jpg', '.jpeg', '.png', '.gif', '.webp',
+        '.woff', '.woff2',
+        '.zip', '.rar', '.7z', '.gz',
+        '.mp3', '.mp4', '.avi', '.mov', '.flv', '.webm'
+    }
+    
+    # Если вложенных архивов больше этого числа, главный архив собирается прямым
+    # копированием данных с заранее известной CRC (переопределяется переменной
+    # окружения DUPLICATOR_BULK_COPY_THRESHOLD)
+    BULK_COPY_THRESHOLD = 8
+    
+    # Версии Python, для которых проверена прямая дозапись в ZipFile (_append_stored_file
+    # работает с его внутренними полями); в остальных архивы пишутся через zipf.open
+    DIRECT_APPEND_PYTHON_VERSIONS = ((3, 8), (3, 13))
+    
+    def __init__(self, fast_mode: bool = False):
+        """
+        Инициализация обработчика
+        
+        Args:
+            fast_mode: быстрое (слабее) сжатие архивов копий
+        """
+        # None - уровень zlib по умолчанию (6)
+        self.compresslevel = self.FAST_COMPRESSLEVEL if fast_mode else None
+        
+        self.bulk_copy_threshold = self._read_bulk_copy_threshold()
+        
         # Настройка rarfile для использования unrar
         rarfile.UNRAR_TOOL = "unrar"
         # Пытаемся найти unrar, если не найден - используем альтернативный путь
@@ -19,6 +126,23 @@ class ArchiveHandler:
         except Exception:
             pass
     
+    def _read_bulk_copy_threshold(self) -> int:
+        """Порог прямого копирования из переменной окружения (при ошибке - BULK_COPY_THRESHOLD)"""
+        value = os.environ.get('DUPLICATOR_BULK_COPY_THRESHOLD')
+        if value is None:
+            return self.BULK_COPY_THRESHOLD
+        try:
+            return int(value)
+        except ValueError:
+            logger.warning("Некорректное значение DUPLICATOR_BULK_COPY_THRESHOLD=%r, используется %d",
+                           value, self.BULK_COPY_THRESHOLD)
+            return self.BULK_COPY_THRESHOLD
+    
+    def uses_checksums(self, archives_count: int) -> bool:
+        """Понадобятся ли create_master_archive готовые CRC32 для такого числа архивов"""
+        first, last = self.DIRECT_APPEND_PYTHON_VERSIONS
+        return archives_count > self.bulk_copy_threshold and first <= sys.version_info[:2] <= last
+    
     def get_archive_type(self, filepath: str) -> Optional[str]:
         """Определение типа архива по расширению"""
         ext = os.path.splitext(filepath)[1].lower()
@@ -35,13 +159,16 @@ class ArchiveHandler:
         archive_type = self.get_archive_type(filepath)
         return archive_type in ['zip', 'rar']
     
-    def extract_archive(self, archive_path: str, extract_to: str) -> bool:
+    def extract_archive(self, archive_path: str, extract_to: str,
+                        on_file_extracted: Optional[Callable[[str], None]] = None) -> bool:
         """
         Распаковка архива в указанную директорию
         
         Args:
             archive_path: путь к архиву
             extract_to: путь для распаковки
+            on_file_extracted: функция, вызываемая с путем каждого распакованного файла
+                (может вызываться из нескольких потоков)
             
         Returns:
             True если успешно, False если ошибка
@@ -53,29 +180,88 @@ class ArchiveHandler:
             archive_type = self.get_archive_type(archive_path)
             
             if archive_type == 'zip':
-                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_to)
+                self.extract_zip_parallel(archive_path, extract_to, on_file_extracted)
                 return True
                 
             elif archive_type == 'rar':
                 try:
                     with rarfile.RarFile(archive_path, 'r') as rar_ref:
                         rar_ref.extractall(extract_to)
+                    # rarfile не сообщает пути распакованных файлов - обходим результат
+                    if on_file_extracted:
+                        for _, file_path, _ in iter_files(extract_to):
+                            on_file_extracted(file_path)
                     return True
                 except rarfile.NeedFirstVolume:
                     # Для многотомных архивов
                     return False
-                except Exception as e:
+                except Exception:
                     # RAR может не работать на некоторых системах
-                    print(f"Ошибка распаковки RAR: {e}")
+                    logger.exception("Ошибка распаковки RAR %s", archive_path)
                     return False
             
             return False
             
-        except Exception as e:
-            print(f"Ошибка при распаковке архива {archive_path}: {e}")
+        except Exception:
+            logger.exception("Ошибка при распаковке архива %s", archive_path)
             return False
     
+    def extract_zip_parallel(self, archive_path: str, extract_to: str,
+                             on_file_extracted: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Многопоточная распаковка ZIP архива
+        
+        Каждый поток открывает свой дескриптор ZipFile (один объект ZipFile нельзя
+        читать из нескольких потоков). Файлы распределяются между потоками по размеру:
+        крупные начинают распаковываться первыми (LPT), чтобы не было длинного хвоста.
+        
+        Args:
+            archive_path: путь к ZIP архиву
+            extract_to: путь для распаковки
+            on_file_extracted: функция, вызываемая с путем каждого распакованного файла
+        """
+        def extract_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+            path = zip_ref.extract(info, extract_to)
+            if on_file_extracted and not info.is_dir():
+                on_file_extracted(path)
+        
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            members = zip_ref.infolist()
+            files = [info for info in members if not info.is_dir()]
+            workers = min(os.cpu_count() or 1, len(files))
+            
+            if workers < 2 or len(files) < self.PARALLEL_EXTRACT_MIN_FILES:
+                for info in members:
+                    extract_member(zip_ref, info)
+                return
+            
+            # Заранее создаем все директории, чтобы потоки не создавали их наперегонки.
+            # Пути директорий проходят ту же проверку, что и при обычной распаковке.
+            dir_names = {info.filename for info in members if info.is_dir()}
+            for info in files:
+                parent = info.filename.rpartition('/')[0]
+                if parent:
+                    dir_names.add(parent + '/')
+            for dir_name in sorted(dir_names):
+                zip_ref.extract(zipfile.ZipInfo(dir_name), extract_to)
+        
+        # Распределяем файлы: самый крупный - в наименее загруженную группу
+        groups = [[] for _ in range(workers)]
+        loads = [0] * workers
+        for info in sorted(files, key=lambda i: i.compress_size, reverse=True):
+            target = loads.index(min(loads))
+            groups[target].append(info)
+            loads[target] += info.compress_size
+        
+        def extract_group(group: List[zipfile.ZipInfo]) -> None:
+            with zipfile.ZipFile(archive_path, 'r') as worker_zip:
+                for info in group:
+                    extract_member(worker_zip, info)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() пробрасывает исключения из потоков
+            list(executor.map(extract_group, groups))
+    
     def create_zip_archive(self, source_dir: str, output_path: str) -> bool:
         """
         Создание ZIP архива из директории
@@ -84,6 +270,50 @@ class ArchiveHandler:
             source_dir: директория с файлами
             output_path: путь для сохранения архива
             
+        Returns:
+            True если успешно, False если ошибка
+        """
+        try:
+            # Обходим все файлы в директории (stat берется из обхода, без повторного вызова)
+            entries = []
+            for arcname, file_path, st in iter_files(source_dir):
+                if st is None:
+                    # Файл нельзя прочитать (битая ссылка) - архив, как и раньше, не создается
+                    st = os.stat(file_path)
+                entries.append((arcname, file_path, st))
+        except Exception:
+            logger.exception("Ошибка при создании архива %s", output_path)
+            return False
+        
+        return self._write_zip(entries, output_path)
+    
+    def create_zip_from_filelist(self, file_list: List[str], source_dir: str, output_path: str) -> bool:
+        """
+        Создание ZIP архива по заранее составленному списку файлов (без обхода директории)
+        
+        Args:
+            file_list: относительные пути файлов внутри source_dir
+            source_dir: директория с файлами
+            output_path: путь для сохранения архива
+            
+        Returns:
+            True если успешно, False если ошибка
+        """
+        try:
+            entries = []
+            for arcname in file_list:
+                file_path = os.path.join(source_dir, arcname)
+                entries.append((arcname, file_path, os.stat(file_path)))
+        except Exception:
+            logger.exception("Ошибка при создании архива %s", output_path)
+            return False
+        
+        return self._write_zip(entries, output_path)
+    
+    def _write_zip(self, entries: List[Tuple[str, str, os.stat_result]], output_path: str) -> bool:
+        """
+        Запись ZIP архива из списка (относительный путь, полный путь, stat)
+        
         Returns:
             True если успешно, False если ошибка
         """
@@ -91,46 +321,199 @@ class ArchiveHandler:
             # Создаем родительскую директорию если нужно
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Обходим все файлы в директории
-                for root, dirs, files in os.walk(source_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Вычисляем относительный путь
-                        arcname = os.path.relpath(file_path, source_dir)
-                        zipf.write(file_path, arcname)
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED,
+                                 compresslevel=self.compresslevel) as zipf:
+                for arcname, file_path, st in entries:
+                    zinfo = self._zipinfo_from_stat(arcname, st)
+                    if os.path.splitext(arcname)[1].lower() in self.STORED_EXTENSIONS:
+                        zinfo.compress_type = zipfile.ZIP_STORED
+                    else:
+                        zinfo.compress_type = zipfile.ZIP_DEFLATED
+                        self._set_compresslevel(zinfo, self.compresslevel)
+                    self._write_file_to_zip(zipf, file_path, zinfo)
             
             return True
             
-        except Exception as e:
-            print(f"Ошибка при создании архива {output_path}: {e}")
+        except Exception:
+            logger.exception("Ошибка при создании архива %s", output_path)
             return False
     
-    def create_master_archive(self, archives_list: List[str], output_path: str) -> bool:
+    @staticmethod
+    def _set_compresslevel(zinfo: zipfile.ZipInfo, compresslevel: Optional[int]) -> None:
+        """
+        Уровень сжатия для записи через zipf.open(zinfo)
+        
+        zipf.open берет уровень только из zinfo (уровень ZipFile применяется
+        лишь при записи по имени). С Python 3.13 это открытый атрибут
+        compress_level, раньше - _compresslevel.
+        """
+        if compresslevel is None:
+            return
+        for name in ('compress_level', '_compresslevel'):
+            if hasattr(zinfo, name):
+                setattr(zinfo, name, compresslevel)
+                return
+        logger.warning("ZipInfo не поддерживает уровень сжатия - используется уровень по умолчанию")
+    
+    @staticmethod
+    def _zipinfo_from_stat(arcname: str, st: os.stat_result) -> zipfile.ZipInfo:
+        """ZipInfo для файла по готовому stat (как ZipInfo.from_file, но без вызова stat)"""
+        zinfo = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[0:6])
+        zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+        zinfo.file_size = st.st_size
+        return zinfo
+    
+    def _write_file_to_zip(self, zipf: zipfile.ZipFile, file_path: str, zinfo: zipfile.ZipInfo) -> None:
+        """
+        Потоковая запись файла в архив
+        
+        Данные читаются через readinto в буфер из общего пула (1 МБ), что сокращает
+        число системных вызовов по сравнению с zipf.write и не выделяет память на
+        каждый файл. zinfo должен быть подготовлен заранее (размер, дата, права).
+        """
+        buffer = _acquire_buffer(self.COPY_BUFFER_SIZE)
+        try:
+            view = memoryview(buffer)
+            with open(file_path, 'rb', buffering=0) as src, zipf.open(zinfo, 'w') as dst:
+                while True:
+                    read = src.readinto(view)
+                    if not read:
+                        break
+                    dst.write(view[:read])
+        finally:
+            _release_buffer(buffer)
+    
+    def file_crc32(self, file_path: str) -> int:
+        """Вычисление CRC32 файла (для добавления в главный архив без повторного чтения)"""
+        crc = 0
+        buffer = _acquire_buffer(self.COPY_BUFFER_SIZE)
+        try:
+            view = memoryview(buffer)
+            with open(file_path, 'rb', buffering=0) as src:
+                while True:
+                    read = src.readinto(view)
+                    if not read:
+                        break
+                    crc = zlib.crc32(view[:read], crc)
+        finally:
+            _release_buffer(buffer)
+        
+        return crc
+    
+    def _copy_to_end(self, file_path: str, dst) -> None:
+        """
+        Дозапись содержимого файла в конец открытого файла dst
+        
+        По возможности данные копируются ядром (copy_file_range) без передачи
+        через Python; если ФС или ОС это не поддерживает - через буфер из пула.
+        """
+        dst.flush()
+        with open(file_path, 'rb', buffering=0) as src:
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    while os.copy_file_range(src.fileno(), dst.fileno(), self.COPY_BUFFER_SIZE * 16):
+                        pass
+                except OSError:
+                    # Докопируем остаток обычным способом с текущих позиций
+                    pass
+            
+            # Позиция dst изменилась в обход буфера - синхронизируем
+            dst.seek(0, os.SEEK_END)
+            
+            buffer = _acquire_buffer(self.COPY_BUFFER_SIZE)
+            try:
+                view = memoryview(buffer)
+                while True:
+                    read = src.readinto(view)
+                    if not read:
+                        break
+                    dst.write(view[:read])
+            finally:
+                _release_buffer(buffer)
+    
+    def _can_append_directly(self, zipf: zipfile.ZipFile) -> bool:
+        """
+        Можно ли дописывать в архив в обход zipf.open (см. _append_stored_file)
+        
+        Только в проверенных версиях Python, при ожидаемом устройстве ZipFile
+        и когда в архив не пишется другой файл.
+        """
+        first, last = self.DIRECT_APPEND_PYTHON_VERSIONS
+        if not first <= sys.version_info[:2] <= last:
+            return False
+        if not all(hasattr(zipf, name) for name in
+                   ('fp', 'filelist', 'NameToInfo', 'start_dir', '_didModify', '_writecheck', '_writing')):
+            return False
+        return not zipf._writing
+    
+    def _append_stored_file(self, zipf: zipfile.ZipFile, file_path: str, arcname: str, crc: int) -> None:
+        """
+        Добавление файла без сжатия с заранее известной CRC32
+        
+        Заголовок записывается сразу с итоговыми размерами и CRC, данные копируются
+        как есть, а запись регистрируется в оглавлении - его допишет zipf.close().
+        Использует внутренние поля ZipFile - вызывать только если _can_append_directly.
+        """
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = zipfile.ZIP_STORED
+        zinfo.CRC = crc
+        zinfo.compress_size = zinfo.file_size
+        
+        zinfo.header_offset = zipf.fp.tell()
+        # Те же проверки, что у zipf.open: повтор имени, ограничения без Zip64
+        zipf._writecheck(zinfo)
+        zipf.fp.write(zinfo.FileHeader())
+        self._copy_to_end(file_path, zipf.fp)
+        
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = zipf.fp.tell()
+        zipf._didModify = True
+    
+    def create_master_archive(self, archives_list: List[str], output_path: str,
+                              checksums: Optional[Dict[str, int]] = None) -> bool:
         """
         Создание главного архива, содержащего другие архивы
         
         Args:
             archives_list: список путей к архивам
             output_path: путь для сохранения главного архива
+            checksums: известные CRC32 архивов {путь: crc} - при большом числе архивов
+                (см. uses_checksums) они копируются целиком без чтения через zipfile
             
         Returns:
             True если успешно, False если ошибка
         """
+        # Для нескольких архивов выигрыш от прямого копирования незаметен -
+        # пишем их обычным способом
+        if not self.uses_checksums(len(archives_list)):
+            checksums = {}
+        else:
+            checksums = checksums or {}
+        
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            # Вложенные архивы уже сжаты - повторное сжатие только тратит CPU,
+            # поэтому сохраняем их без сжатия (ZIP_STORED) потоковым копированием
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zipf:
+                if not self._can_append_directly(zipf):
+                    checksums = {}
                 for archive_path in archives_list:
                     if os.path.exists(archive_path):
                         # Добавляем архив в главный архив
                         arcname = os.path.basename(archive_path)
-                        zipf.write(archive_path, arcname)
+                        if archive_path in checksums:
+                            self._append_stored_file(zipf, archive_path, arcname, checksums[archive_path])
+                        else:
+                            zinfo = zipfile.ZipInfo.from_file(archive_path, arcname)
+                            zinfo.compress_type = zipfile.ZIP_STORED
+                            self._write_file_to_zip(zipf, archive_path, zinfo)
             
             return True
             
-        except Exception as e:
-            print(f"Ошибка при создании главного архива: {e}")
+        except Exception:
+            logger.exception("Ошибка при создании главного архива %s", output_path)
             return False
     
     def get_archive_name_from_domain(self, domain: str) -> str:
@@ -159,12 +542,105 @@ class ArchiveHandler:
         """
         try:
             if os.path.exists(directory):
+                # Крупные поддиректории удаляем параллельно, затем - саму директорию
+                subdirs = [entry.path for entry in os.scandir(directory)
+                           if entry.is_dir(follow_symlinks=False)]
+                if len(subdirs) > 1:
+                    with ThreadPoolExecutor(max_workers=min(len(subdirs), os.cpu_count() or 1)) as executor:
+                        list(executor.map(lambda path: shutil.rmtree(path, ignore_errors=True), subdirs))
                 shutil.rmtree(directory)
             return True
-        except Exception as e:
-            print(f"Ошибка при удалении директории {directory}: {e}")
+        except Exception:
+            logger.exception("Ошибка при удалении директории %s", directory)
+            return False
+    
+    def is_disk_space_low(self, path: str) -> bool:
+        """Проверка, осталось ли на диске с указанным путем меньше LOW_DISK_SPACE_BYTES"""
+        try:
+            return shutil.disk_usage(path).free < self.LOW_DISK_SPACE_BYTES
+        except OSError:
             return False
     
-    def get_temp_dir(self) -> str:
-        """Создание временной директории"""
+    def is_out_of_space(self, path: str) -> bool:
+        """Проверка, заполнена ли ФС с указанным путем (свободно меньше OUT_OF_SPACE_BYTES)"""
+        try:
+            return shutil.disk_usage(path).free < self.OUT_OF_SPACE_BYTES
+        except OSError:
+            return False
+    
+    def is_ram_temp_dir(self, path: str) -> bool:
+        """Проверка, лежит ли директория в RAM_TEMP_DIR"""
+        return os.path.commonpath([os.path.abspath(path), self.RAM_TEMP_DIR]) == self.RAM_TEMP_DIR
+    
+    def clone_directory(self, source_dir: str, target_dir: str,
+                        file_list: Optional[List[str]] = None) -> None:
+        """
+        Клонирование директории через жесткие ссылки
+        
+        Файлы не копируются побайтно: копия ссылается на те же данные на диске.
+        Если жесткие ссылки недоступны (другая ФС, ограничения ОС) - обычное копирование.
+        
+        Args:
+            source_dir: исходная директория
+            target_dir: директория копии (не должна существовать)
+            file_list: относительные пути файлов (если известны - директория не обходится)
+        """
+        def link_or_copy(src: str, dst: str) -> str:
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+            return dst
+        
+        if file_list is None:
+            shutil.copytree(source_dir, target_dir, copy_function=link_or_copy)
+            return
+        
+        os.makedirs(target_dir)
+        created_dirs = {''}
+        for relpath in file_list:
+            parent = os.path.dirname(relpath)
+            if parent not in created_dirs:
+                os.makedirs(os.path.join(target_dir, parent), exist_ok=True)
+                created_dirs.add(parent)
+            link_or_copy(os.path.join(source_dir, relpath), os.path.join(target_dir, relpath))
+    
+    def get_uncompressed_size(self, archive_path: str) -> int:
+        """
+        Оценка размера распакованного содержимого архива
+        
+        Для ZIP/RAR - сумма размеров файлов из оглавления, иначе - размер самого архива.
+        """
+        try:
+            archive_type = self.get_archive_type(archive_path)
+            if archive_type == 'zip':
+                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                    return sum(info.file_size for info in zip_ref.infolist())
+            if archive_type == 'rar':
+                with rarfile.RarFile(archive_path, 'r') as rar_ref:
+                    return sum(info.file_size for info in rar_ref.infolist())
+        except Exception:
+            pass
+        
+        return os.path.getsize(archive_path)
+    
+    def get_temp_dir(self, required_bytes: Optional[int] = None) -> str:
+        """
+        Создание временной директории
+        
+        Если известен ожидаемый объем данных и в RAM_TEMP_DIR (tmpfs) свободно больше
+        RAM_TEMP_SPACE_FACTOR таких объемов, директория создается там: распаковка, замена
+        и архивация идут без обращений к диску. Иначе - в стандартном каталоге временных файлов.
+        
+        Args:
+            required_bytes: ожидаемый объем временных файлов
+        """
+        if required_bytes is not None and os.path.isdir(self.RAM_TEMP_DIR) \
+                and os.access(self.RAM_TEMP_DIR, os.W_OK):
+            try:
+                if shutil.disk_usage(self.RAM_TEMP_DIR).free > required_bytes * self.RAM_TEMP_SPACE_FACTOR:
+                    return tempfile.mkdtemp(prefix="duplicator_", dir=self.RAM_TEMP_DIR)
+            except OSError:
+                pass
+        
         return tempfile.mkdtemp(prefix="duplicator_")
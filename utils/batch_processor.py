@@ -1,29 +1,190 @@
 import os
-import shutil
-from typing import List, Dict
+import errno
+import queue
+import logging
+import logging.handlers
+import multiprocessing
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import (
+    Executor, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+)
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
 from .archive_handler import ArchiveHandler
 from .domain_detector import DomainDetector
 from .domain_generator import DomainGenerator
+from .file_content_cache import FileContentCache
 from .file_processor import FileProcessor
 from .site_name_replacer import SiteNameReplacer
 
+logger = logging.getLogger(__name__)
+
+# Обработчики, созданные в процессе-воркере (объекты главного процесса не передаются)
+_worker_archive_handler: Optional[ArchiveHandler] = None
+_worker_file_processor: Optional[FileProcessor] = None
+_worker_site_name_replacer: Optional[SiteNameReplacer] = None
+
+
+def _process_pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Способ запуска процессов-воркеров
+    
+    Пулы создаются из процесса, где уже работают другие потоки (сервер Streamlit,
+    поток логов, потоки архивов). Дочерний процесс, созданный через fork, может
+    унаследовать захваченную блокировку и зависнуть, поэтому воркеры запускаются
+    через forkserver (или spawn, где его нет). Функции воркеров - уровня модуля.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class _LogRecordForwarder(logging.Handler):
+    """Передача записей лога из процессов-воркеров в логгеры главного процесса"""
+    
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+
+def _init_copy_worker(log_queue: Optional[multiprocessing.Queue] = None, fast_mode: bool = False):
+    """
+    Инициализация обработчиков в процессе-воркере
+    
+    Args:
+        log_queue: очередь, через которую записи лога уходят в главный процесс
+        fast_mode: быстрое сжатие архивов копий
+    """
+    global _worker_archive_handler, _worker_file_processor, _worker_site_name_replacer
+    
+    if log_queue is not None:
+        # Воркеры не пишут в stderr сами - все записи выводит главный процесс
+        logging.getLogger().handlers = [logging.handlers.QueueHandler(log_queue)]
+    
+    _worker_archive_handler = ArchiveHandler(fast_mode=fast_mode)
+    # Копии - жесткие ссылки на файлы оригинала: файл с заменами декодируется
+    # один раз на воркер, а не для каждой копии
+    _worker_file_processor = FileProcessor(content_cache=FileContentCache())
+    _worker_site_name_replacer = SiteNameReplacer()
+
+
+def _build_one_copy(extract_dir: str, file_list: List[Tuple[str, int, bool]], archive_temp_dir: str,
+                    idx: int, new_domain: str, original_domain: str,
+                    original_site_name: Optional[str], compute_checksum: bool = False) -> Optional[Dict]:
+    """
+    Создание одной копии сайта (выполняется в процессе-воркере)
+    
+    Args:
+        extract_dir: директория с распакованным оригиналом
+        file_list: список файлов оригинала (см. FileProcessor.list_files)
+        archive_temp_dir: временная директория архива
+        idx: номер копии
+        new_domain: новый домен
+        original_domain: оригинальный домен
+        original_site_name: оригинальное название сайта
+        compute_checksum: посчитать CRC32 архива (нужна главному архиву только
+            при большом числе копий, см. ArchiveHandler.uses_checksums)
+        
+    Returns:
+        dict с информацией о созданном архиве или None при ошибке архивации
+    """
+    if _worker_archive_handler is None:
+        _init_copy_worker()
+    
+    relpaths = [relpath for relpath, _, _ in file_list]
+    
+    # Создаем директорию для копии (жесткие ссылки вместо копирования файлов)
+    copy_dir = os.path.join(archive_temp_dir, f"copy_{idx}")
+    _worker_archive_handler.clone_directory(extract_dir, copy_dir, relpaths)
+    
+    # Генерируем новое название из нового домена
+    new_site_name = _worker_site_name_replacer.generate_site_name_from_domain(new_domain)
+    
+    # Заменяем домен и название сайта во всех файлах
+    stats = _worker_file_processor.process_filelist(
+        file_list,
+        copy_dir, 
+        original_domain, 
+        new_domain,
+        original_site_name,
+        new_site_name
+    )
+    
+    # Создаем архив из обработанной копии
+    archive_name_output = _worker_archive_handler.get_archive_name_from_domain(new_domain)
+    archive_output_path = os.path.join(archive_temp_dir, archive_name_output)
+    
+    # После переименования папок пути из списка устарели - тогда обходим копию заново
+    if stats['renamed_directories']:
+        created = _worker_archive_handler.create_zip_archive(copy_dir, archive_output_path)
+    else:
+        created = _worker_archive_handler.create_zip_from_filelist(relpaths, copy_dir, archive_output_path)
+    
+    archive_info = None
+    if created:
+        archive_info = {
+            'path': archive_output_path,
+            'domain': new_domain,
+            # CRC считается здесь, параллельно, пока архив в кеше ФС - главный архив его не перечитывает
+            'crc32': _worker_archive_handler.file_crc32(archive_output_path) if compute_checksum else None,
+            'stats': stats
+        }
+    
+    # Архив не создан, потому что кончилось место в памяти, - вся обработка будет
+    # повторена на диске (см. BatchProcessor.process_multiple_archives)
+    out_of_space = (not created and _worker_archive_handler.is_ram_temp_dir(archive_temp_dir)
+                    and _worker_archive_handler.is_out_of_space(archive_temp_dir))
+    
+    # Копии удаляются вместе со всей временной директорией в конце обработки,
+    # раньше - только если на диске заканчивается место
+    if _worker_archive_handler.is_disk_space_low(archive_temp_dir):
+        _worker_archive_handler.cleanup_directory(copy_dir)
+    
+    if out_of_space:
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), archive_output_path)
+    
+    return archive_info
+
 
 class BatchProcessor:
     """Пакетная обработка множества архивов"""
     
-    def __init__(self):
-        """Инициализация процессора"""
-        self.archive_handler = ArchiveHandler()
+    def __init__(self, fast_mode: bool = False):
+        """
+        Инициализация процессора
+        
+        Args:
+            fast_mode: быстрое (слабее) сжатие архивов копий
+        """
+        self.fast_mode = fast_mode
+        self.archive_handler = ArchiveHandler(fast_mode=fast_mode)
         self.domain_detector = DomainDetector()
         self.domain_generator = DomainGenerator()
         self.file_processor = FileProcessor()
         self.site_name_replacer = SiteNameReplacer()
+        # Генератор общий для всех архивов - уникальность доменов в рамках сессии
+        self._generator_lock = threading.Lock()
+        # Записи лога из процессов-воркеров собираются одним потоком главного процесса
+        # (из того же контекста, что и пулы процессов)
+        self._log_queue = _process_pool_context().Queue()
+        self._log_listener = logging.handlers.QueueListener(self._log_queue, _LogRecordForwarder())
+    
+    @contextmanager
+    def _forward_worker_logs(self):
+        """Прием записей лога от процессов-воркеров на время работы пула"""
+        self._log_listener.start()
+        try:
+            yield
+        finally:
+            self._log_listener.stop()
         
     def process_single_archive(self, archive_path: str, copies_count: int, 
                                domain_zone: str, temp_base_dir: str,
-                               progress_callback=None) -> Dict:
+                               progress_callback=None,
+                               copy_executor: Optional[Executor] = None,
+                               compute_checksums: bool = False) -> Dict:
         """
         Обработка одного архива с созданием копий
         
@@ -33,6 +194,8 @@ class BatchProcessor:
             domain_zone: доменная зона (.com, .info и т.д.)
             temp_base_dir: базовая директория для временных файлов
             progress_callback: функция для обновления прогресса
+            copy_executor: пул процессов для создания копий (если не указан - создается свой)
+            compute_checksums: посчитать CRC32 архивов копий (для главного архива)
             
         Returns:
             dict с результатами обработки
@@ -43,6 +206,7 @@ class BatchProcessor:
             'original_domain': None,
             'generated_archives': [],
             'error': None,
+            'out_of_space': False,
             'stats': {}
         }
         
@@ -53,12 +217,15 @@ class BatchProcessor:
                 progress_callback(f"Обработка {archive_name}: распаковка...")
             
             # 1. Создаем временную директорию для этого архива
-            archive_temp_dir = os.path.join(temp_base_dir, f"archive_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+            # (mkdtemp дает уникальное имя и при параллельной обработке архивов)
+            archive_temp_dir = tempfile.mkdtemp(prefix="archive_", dir=temp_base_dir)
             extract_dir = os.path.join(archive_temp_dir, "extracted")
             
-            # 2. Распаковываем архив
-            if not self.archive_handler.extract_archive(archive_path, extract_dir):
+            # 2. Распаковываем архив (список файлов составляется параллельно с распаковкой)
+            file_list = self._extract_with_file_list(archive_path, extract_dir)
+            if file_list is None:
                 result['error'] = 'Ошибка распаковки архива'
+                result['out_of_space'] = self.archive_handler.is_out_of_space(archive_temp_dir)
                 return result
             
             if progress_callback:
@@ -73,6 +240,12 @@ class BatchProcessor:
                 original_domain = domain_from_filename
                 if progress_callback:
                     progress_callback(f"Обработка {archive_name}: домен из названия: {original_domain}")
+                
+                # 3.5. Определяем название сайта
+                if progress_callback:
+                    progress_callback(f"Обработка {archive_name}: определение названия сайта...")
+                
+                original_site_name = self.site_name_replacer.detect_site_name(extract_dir, original_domain)
             else:
                 # Либо нет домена, либо только подсказка (dimvital)
                 hint = domain_from_filename if domain_from_filename else None
@@ -80,8 +253,10 @@ class BatchProcessor:
                 if progress_callback and hint:
                     progress_callback(f"Обработка {archive_name}: поиск с подсказкой '{hint}'...")
                 
-                # Ищем в файлах сайта с подсказкой из названия
-                original_domain = self.domain_detector.detect_domain_in_directory(extract_dir, hint_from_filename=hint)
+                # Ищем домен и название сайта в файлах за один обход
+                original_domain, original_site_name = self.domain_detector.detect_domain_and_site_name(
+                    extract_dir, self.site_name_replacer, hint_from_filename=hint
+                )
                 
                 if not original_domain:
                     result['error'] = 'Не удалось определить домен'
@@ -89,58 +264,38 @@ class BatchProcessor:
             
             result['original_domain'] = original_domain
             
-            # 3.5. Определяем название сайта
-            if progress_callback:
-                progress_callback(f"Обработка {archive_name}: определение названия сайта...")
-            
-            original_site_name = self.site_name_replacer.detect_site_name(extract_dir, original_domain)
-            
             if progress_callback:
                 progress_callback(f"Обработка {archive_name}: генерация доменов...")
             
             # 4. Генерируем новые домены
-            new_domains = self.domain_generator.generate_domains(
-                original_domain, 
-                copies_count, 
-                domain_zone
-            )
-            
-            # 5. Создаем копии для каждого нового домена
-            archives_created = []
-            
-            for idx, new_domain in enumerate(new_domains):
-                if progress_callback:
-                    progress_callback(f"Обработка {archive_name}: копия {idx+1}/{copies_count} ({new_domain})...")
-                
-                # Создаем директорию для копии
-                copy_dir = os.path.join(archive_temp_dir, f"copy_{idx}")
-                shutil.copytree(extract_dir, copy_dir)
-                
-                # Генерируем новое название из нового домена
-                new_site_name = self.site_name_replacer.generate_site_name_from_domain(new_domain)
-                
-                # Заменяем домен и название сайта во всех файлах
-                stats = self.file_processor.process_directory(
-                    copy_dir, 
+            with self._generator_lock:
+                new_domains = self.domain_generator.generate_domains(
                     original_domain, 
-                    new_domain,
-                    original_site_name,
-                    new_site_name
+                    copies_count, 
+                    domain_zone
                 )
-                
-                # Создаем архив из обработанной копии
-                archive_name_output = self.archive_handler.get_archive_name_from_domain(new_domain)
-                archive_output_path = os.path.join(archive_temp_dir, archive_name_output)
-                
-                if self.archive_handler.create_zip_archive(copy_dir, archive_output_path):
-                    archives_created.append({
-                        'path': archive_output_path,
-                        'domain': new_domain,
-                        'stats': stats
-                    })
-                
-                # Удаляем директорию копии чтобы освободить место
-                self.archive_handler.cleanup_directory(copy_dir)
+            
+            # 5. Создаем копии для каждого нового домена (параллельно в отдельных процессах)
+            if copy_executor is not None:
+                copies_by_idx = self._build_copies(
+                    copy_executor, archive_name, extract_dir, file_list, archive_temp_dir,
+                    new_domains, original_domain, original_site_name, progress_callback,
+                    compute_checksums
+                )
+            else:
+                max_workers = max(1, min(len(new_domains), os.cpu_count() or 1))
+                with self._forward_worker_logs(), \
+                        ProcessPoolExecutor(max_workers=max_workers, mp_context=_process_pool_context(),
+                                            initializer=_init_copy_worker,
+                                            initargs=(self._log_queue, self.fast_mode)) as executor:
+                    copies_by_idx = self._build_copies(
+                        executor, archive_name, extract_dir, file_list, archive_temp_dir,
+                        new_domains, original_domain, original_site_name, progress_callback,
+                        compute_checksums
+                    )
+            
+            # Сохраняем порядок копий как в списке доменов
+            archives_created = [copies_by_idx[idx] for idx in sorted(copies_by_idx) if copies_by_idx[idx]]
             
             # 6. Сохраняем результаты
             result['success'] = True
@@ -152,21 +307,110 @@ class BatchProcessor:
             
         except Exception as e:
             result['error'] = str(e)
+            result['out_of_space'] = isinstance(e, OSError) and e.errno == errno.ENOSPC
         
         return result
     
+    def _extract_with_file_list(self, archive_path: str,
+                                extract_dir: str) -> Optional[List[Tuple[str, int, bool]]]:
+        """
+        Распаковка архива с одновременным составлением списка файлов
+        
+        Распакованные файлы передаются через очередь в отдельный поток, который
+        определяет их размер и тип, пока распаковываются остальные. Замену доменов
+        так начать нельзя: исходный домен и название сайта определяются только
+        по всему распакованному дереву.
+        
+        Returns:
+            список файлов (как FileProcessor.list_files) или None при ошибке распаковки
+        """
+        extracted = queue.Queue()
+        entries = {}
+        failed = []
+        
+        def describe_extracted() -> None:
+            while True:
+                filepath = extracted.get()
+                if filepath is None:
+                    return
+                if failed:
+                    continue
+                try:
+                    entry = self.file_processor.describe_file(extract_dir, filepath)
+                except OSError:
+                    logger.exception("Ошибка при чтении распакованного файла %s", filepath)
+                    failed.append(filepath)
+                    continue
+                # Повторяющиеся записи архива перезаписывают один и тот же файл
+                entries[entry[0]] = entry
+        
+        consumer = threading.Thread(target=describe_extracted, daemon=True)
+        consumer.start()
+        try:
+            extracted_ok = self.archive_handler.extract_archive(archive_path, extract_dir, extracted.put)
+        finally:
+            extracted.put(None)
+            consumer.join()
+        
+        if not extracted_ok:
+            return None
+        if failed:
+            # Поток описания файлов упал - составляем список обычным обходом
+            return self.file_processor.list_files(extract_dir)
+        return sorted(entries.values())
+    
+    def _build_copies(self, executor: Executor, archive_name: str, extract_dir: str,
+                      file_list: List[Tuple[str, int, bool]], archive_temp_dir: str,
+                      new_domains: List[str], original_domain: str,
+                      original_site_name: Optional[str], progress_callback=None,
+                      compute_checksums: bool = False) -> Dict[int, Optional[Dict]]:
+        """Запуск создания копий в пуле процессов, возвращает {номер копии: результат}"""
+        copies_by_idx = {}
+        futures = {
+            executor.submit(
+                _build_one_copy,
+                extract_dir,
+                file_list,
+                archive_temp_dir,
+                idx,
+                new_domain,
+                original_domain,
+                original_site_name,
+                compute_checksums
+            ): idx
+            for idx, new_domain in enumerate(new_domains)
+        }
+        
+        # Прогресс обновляется по мере готовности копий
+        for done, future in enumerate(as_completed(futures), 1):
+            idx = futures[future]
+            copies_by_idx[idx] = future.result()
+            
+            if progress_callback:
+                progress_callback(f"Обработка {archive_name}: копия {done}/{len(new_domains)} ({new_domains[idx]}) готова")
+        
+        return copies_by_idx
+    
     def process_multiple_archives(self, archives: List[str], copies_count: int,
                                   domain_zone: str, output_dir: str,
-                                  progress_callback=None) -> Dict:
+                                  progress_callback=None,
+                                  max_parallel_archives: Optional[int] = None) -> Dict:
         """
         Обработка множества архивов
         
+        Архивы обрабатываются параллельно в потоках (распаковка, определение домена),
+        а копии всех архивов собираются в общем пуле процессов. Сообщения о прогрессе
+        передаются через очередь и вызывают progress_callback только в текущем потоке,
+        чтобы обновления интерфейса Streamlit оставались в главном потоке.
+        
         Args:
             archives: список путей к архивам
             copies_count: количество копий для каждого архива
             domain_zone: доменная зона (.com, .info)
             output_dir: директория для сохранения результата
             progress_callback: функция для обновления прогресса
+            max_parallel_archives: сколько архивов обрабатывать одновременно
+                (по умолчанию - min(количество архивов, количество CPU))
             
         Returns:
             dict с результатами обработки всех архивов
@@ -181,25 +425,36 @@ class BatchProcessor:
             'errors': []
         }
         
+        # Время запуска - в названии главного архива
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        
         try:
-            # Создаем временную директорию
-            temp_base_dir = self.archive_handler.get_temp_dir()
-            all_generated_archives = []
+            # Создаем временную директорию (распакованные файлы + архив на каждую копию)
+            required_bytes = sum(
+                self.archive_handler.get_uncompressed_size(archive_path)
+                + os.path.getsize(archive_path) * copies_count
+                for archive_path in archives
+            )
+            temp_base_dir = self.archive_handler.get_temp_dir(required_bytes)
+            
+            results = self._process_archives(archives, copies_count, domain_zone, temp_base_dir,
+                                             progress_callback, max_parallel_archives)
             
-            # Обрабатываем каждый архив
-            for idx, archive_path in enumerate(archives):
+            # Оценка объема оказалась мала и в памяти кончилось место - повторяем на диске
+            if self.archive_handler.is_ram_temp_dir(temp_base_dir) \
+                    and any(result['out_of_space'] for result in results):
                 if progress_callback:
-                    progress_callback(f"Архив {idx+1}/{len(archives)}: {os.path.basename(archive_path)}")
-                
-                # Обрабатываем архив
-                result = self.process_single_archive(
-                    archive_path,
-                    copies_count,
-                    domain_zone,
-                    temp_base_dir,
-                    progress_callback
-                )
-                
+                    progress_callback("Не хватило места в памяти, повторная обработка на диске...")
+                self.archive_handler.cleanup_directory(temp_base_dir)
+                temp_base_dir = self.archive_handler.get_temp_dir()
+                results = self._process_archives(archives, copies_count, domain_zone, temp_base_dir,
+                                                 progress_callback, max_parallel_archives)
+            
+            all_generated_archives = []
+            archive_checksums = {}
+            
+            # Собираем результаты в исходном порядке архивов
+            for archive_path, result in zip(archives, results):
                 overall_result['results'].append(result)
                 
                 if result['success']:
@@ -209,6 +464,8 @@ class BatchProcessor:
                     # Собираем все созданные архивы
                     for archive_info in result['generated_archives']:
                         all_generated_archives.append(archive_info['path'])
+                        if archive_info['crc32'] is not None:
+                            archive_checksums[archive_info['path']] = archive_info['crc32']
                 else:
                     overall_result['archives_failed'] += 1
                     overall_result['errors'].append({
@@ -223,11 +480,11 @@ class BatchProcessor:
             if all_generated_archives:
                 os.makedirs(output_dir, exist_ok=True)
                 
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 master_archive_name = f"duplicates_{timestamp}.zip"
                 master_archive_path = os.path.join(output_dir, master_archive_name)
                 
-                if self.archive_handler.create_master_archive(all_generated_archives, master_archive_path):
+                if self.archive_handler.create_master_archive(all_generated_archives, master_archive_path,
+                                                             archive_checksums):
                     overall_result['master_archive_path'] = master_archive_path
                     overall_result['success'] = True
             
@@ -245,6 +502,64 @@ class BatchProcessor:
         
         return overall_result
     
+    def _process_archives(self, archives: List[str], copies_count: int, domain_zone: str,
+                          temp_base_dir: str, progress_callback=None,
+                          max_parallel_archives: Optional[int] = None) -> List[Dict]:
+        """Обработка архивов во временной директории, результаты - в порядке архивов"""
+        if max_parallel_archives is None:
+            max_parallel_archives = min(len(archives), os.cpu_count() or 1)
+        max_parallel_archives = max(1, max_parallel_archives)
+        
+        # Сообщения из рабочих потоков -> главный поток
+        messages = queue.Queue()
+        
+        # CRC копий считаются, только если главный архив будет собираться с ними
+        compute_checksums = self.archive_handler.uses_checksums(len(archives) * copies_count)
+        
+        def process_archive(idx: int, archive_path: str) -> Dict:
+            messages.put(f"Архив {idx+1}/{len(archives)}: {os.path.basename(archive_path)}")
+            return self.process_single_archive(
+                archive_path,
+                copies_count,
+                domain_zone,
+                temp_base_dir,
+                messages.put,
+                copy_executor,
+                compute_checksums
+            )
+        
+        # Обрабатываем архивы параллельно (воркеры копий запускаются при первой
+        # отправке задачи - уже из потока архива, поэтому не через fork)
+        with self._forward_worker_logs(), \
+                ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=_process_pool_context(),
+                                    initializer=_init_copy_worker,
+                                    initargs=(self._log_queue, self.fast_mode)) as copy_executor, \
+                ThreadPoolExecutor(max_workers=max_parallel_archives) as archive_executor:
+            futures = [
+                archive_executor.submit(process_archive, idx, archive_path)
+                for idx, archive_path in enumerate(archives)
+            ]
+            
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                self._forward_messages(messages, progress_callback)
+        
+        self._forward_messages(messages, progress_callback)
+        
+        return [future.result() for future in futures]
+    
+    def _forward_messages(self, messages: queue.Queue, progress_callback=None):
+        """Передача накопленных сообщений о прогрессе в callback (в текущем потоке)"""
+        while True:
+            try:
+                message = messages.get_nowait()
+            except queue.Empty:
+                return
+            
+            if progress_callback:
+                progress_callback(message)
+    
     def get_summary_text(self, result: Dict) -> str:
         """Генерация текстового резюме обработки"""
         lines = []
@@ -1,13 +1,50 @@
 import re
 import os
-from typing import Optional, Dict
+import string
+import mmap
+from typing import Optional, Dict, Tuple, List, Callable, Iterable, Iterator, Union
 from collections import Counter
-from charset_normalizer import from_path
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+from .text_decoding import decode_text
 
 
 class DomainDetector:
     """Автоматическое определение домена в файлах сайта"""
     
+    # Скомпилированные вспомогательные паттерны
+    _PORT_RE = re.compile(r':\d+')
+    _DATE_RE = re.compile(r'[_-]?\d{4,8}[_-]?')
+    _ARCHIVE_EXT_RE = re.compile(r'\.(?:tar\.gz|zip|rar|7z|tar|gz)$')
+    _NAME_SUFFIX_RE = re.compile(r'[_-](?:backup|archive|site|www|web)(?=[_.-]|$)')
+    _FNAME_DOMAIN_RE = re.compile(r'([a-zA-Z0-9-]+\.[a-zA-Z]{2,})')
+    _NON_NAME_CHARS_RE = re.compile(r'[^a-zA-Z0-9-]')
+    
+    # Удаляет допустимые в домене символы - непустой остаток значит недопустимый символ
+    _DOMAIN_CHARS_TABLE = str.maketrans('', '', string.ascii_letters + string.digits + '-.')
+    
+    # Известные двухуровневые зоны
+    _TWO_LEVEL_ZONES = frozenset(('co.uk', 'com.au', 'co.jp', 'com.br', 'co.za'))
+    
+    # Подстроки, без которых соответствующий паттерн из domain_patterns не может совпасть
+    _PATTERN_MARKERS = (('://',), ('w.', 'W.'), ('"', "'"), ('.',))
+    
+    # Сколько файлов обрабатывает одна задача при параллельном сканировании
+    SCAN_CHUNK_FILES = 64
+    
+    # ASCII-файлы крупнее этого размера при поиске только доменов сканируются через mmap без декодирования
+    MMAP_THRESHOLD = 256 * 1024
+    
+    # Какими частями отображение проверяется на ASCII
+    MMAP_ASCII_CHECK_CHUNK = 4 * 1024 * 1024
+    
+    # Максимальный размер кэшей clean_domain / is_valid_domain (при переполнении очищаются)
+    DOMAIN_CACHE_SIZE = 4096
+    
+    # Сколько результатов сканирования директорий хранится (при переполнении очищается)
+    SCAN_CACHE_SIZE = 16
+    
     def __init__(self):
         """Инициализация детектора"""
         # Приоритетные паттерны (высокий вес)
@@ -58,6 +95,33 @@ class DomainDetector:
         
         self.text_extensions = set(self.file_weights.keys())
         
+        # Паттерны компилируются один раз, а не при каждом поиске
+        self._compiled_priority = [
+            (re.compile(pattern, re.IGNORECASE | re.DOTALL), weight)
+            for pattern, weight in self.priority_patterns
+        ]
+        self._compiled_patterns = [
+            (re.compile(pattern, re.IGNORECASE), markers)
+            for pattern, markers in zip(self.domain_patterns, self._PATTERN_MARKERS)
+        ]
+        
+        # Те же паттерны для байтов (паттерны ASCII - совпадения в UTF-8/cp1251 те же)
+        self._compiled_bytes_priority = [
+            (re.compile(pattern.encode('ascii'), re.IGNORECASE | re.DOTALL), weight)
+            for pattern, weight in self.priority_patterns
+        ]
+        self._compiled_bytes_patterns = [
+            (re.compile(pattern.encode('ascii'), re.IGNORECASE), tuple(marker.encode('ascii') for marker in markers))
+            for pattern, markers in zip(self.domain_patterns, self._PATTERN_MARKERS)
+        ]
+        
+        # Кэши результатов clean_domain и проверки формата в is_valid_domain
+        self._clean_cache: Dict[str, str] = {}
+        self._valid_cache: Dict[str, bool] = {}
+        
+        # Результаты сканирования: директория -> (сигнатура файлов, site_name_replacer, результат)
+        self._scan_cache: Dict[str, tuple] = {}
+        
         # Расширенный список игнорируемых доменов
         self.ignore_domains = {
             # Google сервисы
@@ -95,51 +159,111 @@ class DomainDetector:
     
     def read_file_safely(self, filepath: str) -> Optional[str]:
         """Безопасное чтение файла с автоопределением кодировки"""
-        try:
-            # Пытаемся определить кодировку
-            result = from_path(filepath).best()
-            if result:
-                return str(result)
-        except Exception:
-            pass
-        
-        # Fallback - пробуем разные кодировки
-        for encoding in ['utf-8', 'cp1251', 'latin1', 'ascii']:
-            try:
-                with open(filepath, 'r', encoding=encoding) as f:
-                    return f.read()
-            except Exception:
-                continue
+        data = self._read_many([filepath])[0]
+        if data is None:
+            return None
         
-        return None
+        return self.decode_text(data)
     
-    def extract_domains_from_text(self, text: str) -> list:
-        """Извлечение доменов из текста"""
+    def decode_text(self, data: bytes) -> Optional[str]:
+        """Декодирование содержимого файла с автоопределением кодировки"""
+        return decode_text(data)
+    
+    def _read_many(self, filepaths: List[str], map_large: bool = False) -> List[Optional[Union[bytes, mmap.mmap]]]:
+        """
+        Чтение пачки файлов целиком (None для нечитаемых)
+        
+        Args:
+            map_large: ASCII-файлы от MMAP_THRESHOLD возвращаются как mmap без чтения
+                в память; вызывающий код должен закрыть их. Для остальных байтовые
+                паттерны (\b, \s только по ASCII) дали бы не те совпадения, что в
+                декодированном тексте, - они читаются и декодируются как обычно
+        """
+        contents = []
+        for filepath in filepaths:
+            try:
+                with open(filepath, 'rb', buffering=0) as f:
+                    if map_large and os.fstat(f.fileno()).st_size >= self.MMAP_THRESHOLD:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        if all(mapped[offset:offset + self.MMAP_ASCII_CHECK_CHUNK].isascii()
+                               for offset in range(0, len(mapped), self.MMAP_ASCII_CHECK_CHUNK)):
+                            contents.append(mapped)
+                            continue
+                        mapped.close()
+                    contents.append(f.readall())
+            except (OSError, ValueError):
+                contents.append(None)
+        
+        return contents
+    
+    def extract_domains_from_text(self, text: Union[str, bytes, mmap.mmap]) -> list:
+        """Извлечение доменов из текста (или из байтов/mmap файла без декодирования)"""
         domains = []
         
-        for pattern in self.domain_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            domains.extend(matches)
+        if not isinstance(text, str):
+            if text.find(b'.') < 0:
+                return domains
+            for pattern, markers in self._compiled_bytes_patterns:
+                if any(text.find(marker) >= 0 for marker in markers):
+                    domains.extend(match.decode('ascii') for match in pattern.findall(text))
+            return domains
+        
+        # Любой домен содержит точку - без нее текст можно не сканировать
+        if '.' not in text:
+            return domains
+        
+        # Паттерны намеренно не объединены в одну альтернацию: каждый засчитывает
+        # свои совпадения (в т.ч. перекрывающиеся с другими), от этого зависят веса.
+        # Точная объединенная версия на re медленнее нескольких отдельных проходов.
+        for pattern, markers in self._compiled_patterns:
+            # Поиск подстроки дешевле прохода regex: без маркера совпадений быть не может
+            if any(marker in text for marker in markers):
+                domains.extend(pattern.findall(text))
         
         return domains
     
     def clean_domain(self, domain: str) -> str:
         """Очистка домена от лишних символов"""
+        # На сайте встречается несколько одних и тех же доменов - результат кэшируется
+        clean = self._clean_cache.get(domain)
+        if clean is None:
+            if len(self._clean_cache) >= self.DOMAIN_CACHE_SIZE:
+                self._clean_cache.clear()
+            clean = self._clean_cache[domain] = self._clean_domain(domain)
+        return clean
+    
+    def _clean_domain(self, domain: str) -> str:
+        """Очистка домена без кэша"""
         domain = domain.lower().strip()
         
         # Удаляем www
-        domain = domain.replace('www.', '')
+        if 'www.' in domain:
+            domain = domain.replace('www.', '')
         
-        # Удаляем порт если есть
-        domain = re.sub(r':\d+', '', domain)
+        # Удаляем порт если есть (двоеточие встречается редко - regex только при нем)
+        if ':' in domain:
+            domain = self._PORT_RE.sub('', domain)
         
         # Удаляем путь если есть
-        domain = domain.split('/')[0]
+        slash = domain.find('/')
+        if slash >= 0:
+            domain = domain[:slash]
         
         return domain
     
     def is_valid_domain(self, domain: str) -> bool:
         """Проверка валидности домена"""
+        valid = self._valid_cache.get(domain)
+        if valid is None:
+            if len(self._valid_cache) >= self.DOMAIN_CACHE_SIZE:
+                self._valid_cache.clear()
+            valid = self._valid_cache[domain] = self._check_domain_format(domain)
+        
+        # Игнорируем известные домены (не кэшируется - список можно изменить)
+        return valid and domain not in self.ignore_domains
+    
+    def _check_domain_format(self, domain: str) -> bool:
+        """Проверка формата домена без кэша"""
         # Минимальная длина
         if len(domain) < 4:
             return False
@@ -148,35 +272,48 @@ class DomainDetector:
         if '.' not in domain:
             return False
         
-        # Проверка формата
-        parts = domain.split('.')
-        if len(parts) < 2:
+        # Проверка формата: только буквы, цифры, дефис и точки
+        if domain.translate(self._DOMAIN_CHARS_TABLE):
             return False
         
-        # Проверка каждой части
-        for part in parts:
-            if not part or not re.match(r'^[a-zA-Z0-9-]+$', part):
-                return False
+        # Части между точками не должны быть пустыми
+        parts = domain.split('.')
+        if '' in parts:
+            return False
         
         # Проверка зоны (должна быть только из букв)
         if not parts[-1].isalpha():
             return False
         
-        # Игнорируем известные домены
-        if domain in self.ignore_domains:
-            return False
-        
         return True
     
-    def extract_priority_domains(self, text: str) -> Dict[str, int]:
+    def extract_priority_domains(self, text: Union[str, bytes, mmap.mmap]) -> Dict[str, int]:
         """Извлечение доменов из приоритетных паттернов с весами"""
         priority_domains = {}
         
-        for pattern, weight in self.priority_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                # В приоритетных паттернах домен может быть во второй группе
-                domain = match[1] if isinstance(match, tuple) and len(match) > 1 else match
+        if isinstance(text, str):
+            if '.' not in text:
+                return priority_domains
+            patterns = self._compiled_priority
+        else:
+            if text.find(b'.') < 0:
+                return priority_domains
+            patterns = self._compiled_bytes_priority
+        
+        # Каждый паттерн начинается с литерала, по которому re быстро ищет кандидатов;
+        # объединение паттернов в одну альтернацию эту оптимизацию теряет и медленнее.
+        for pattern, weight in patterns:
+            matches = pattern.findall(text)
+            if not matches:
+                continue
+            
+            # В приоритетных паттернах с двумя группами домен во второй группе
+            if pattern.groups > 1:
+                matches = [match[1] for match in matches]
+            
+            for domain in matches:
+                if isinstance(domain, bytes):
+                    domain = domain.decode('ascii')
                 if domain:
                     clean = self.clean_domain(domain)
                     if self.is_valid_domain(clean):
@@ -199,12 +336,9 @@ class DomainDetector:
         
         # Если больше 2 частей и не известные двухуровневые зоны
         if len(parts) > 2:
-            # Список двухуровневых зон
-            two_level_zones = ['co.uk', 'com.au', 'co.jp', 'com.br', 'co.za']
-            
             # Проверяем последние две части
             last_two = '.'.join(parts[-2:])
-            if last_two in two_level_zones:
+            if last_two in self._TWO_LEVEL_ZONES:
                 # Берем 3 последние части (subdomain.domain.co.uk)
                 if len(parts) > 3:
                     return '.'.join(parts[-3:])
@@ -224,22 +358,18 @@ class DomainDetector:
         - "site-example-com.zip" → "example.com"
         - "example_com_2024.zip" → "example.com"
         """
-        # Убираем расширение архива
-        name = filename.lower()
-        for ext in ['.zip', '.rar', '.7z', '.tar', '.gz', '.tar.gz']:
-            name = name.replace(ext, '')
+        # Убираем расширение архива (только в конце: "my.zipper.com.zip" → "my.zipper.com")
+        name = self._ARCHIVE_EXT_RE.sub('', filename.lower())
         
-        # Убираем общие суффиксы
-        for suffix in ['_backup', '-backup', '_archive', '-archive', '_site', '-site', 
-                       '_www', '-www', '_web', '-web']:
-            name = name.replace(suffix, '')
+        # Убираем общие суффиксы - только целыми словами ("-website" не трогаем)
+        name = self._NAME_SUFFIX_RE.sub('', name)
         
         # Убираем даты (2024, 20240102 и т.д.)
-        name = re.sub(r'[_-]?\d{4,8}[_-]?', '', name)
+        name = self._DATE_RE.sub('', name)
         
         # Пробуем найти домен напрямую
         # Паттерн: что-то.зона (example.com)
-        domain_match = re.search(r'([a-zA-Z0-9-]+\.[a-zA-Z]{2,})', name)
+        domain_match = self._FNAME_DOMAIN_RE.search(name)
         if domain_match:
             domain = domain_match.group(1)
             if self.is_valid_domain(domain):
@@ -263,7 +393,7 @@ class DomainDetector:
         # Возвращаем его как подсказку для дальнейшего поиска
         if name and len(name) >= 3:
             # Очищаем от недопустимых символов
-            clean_name = re.sub(r'[^a-zA-Z0-9-]', '', name)
+            clean_name = self._NON_NAME_CHARS_RE.sub('', name)
             if len(clean_name) >= 3 and clean_name[0].isalpha():
                 # Возвращаем название без зоны (будет использовано как подсказка)
                 return clean_name.lower()
@@ -278,46 +408,211 @@ class DomainDetector:
             directory: путь к директории с файлами
             hint_from_filename: подсказка из названия файла (например "dimvital" из "DimVital.zip")
         """
-        # Счетчик с весами
+        weighted_domains, priority_domains, _, _ = self._scan_directory(directory)
+        
+        return self.choose_domain(weighted_domains, priority_domains, hint_from_filename)
+    
+    def detect_domain_and_site_name(self, directory: str, site_name_replacer,
+                                    hint_from_filename: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Определение домена и названия сайта за один обход директории
+        
+        Каждый файл читается один раз, в его содержимом ищутся и домены, и названия.
+        Бонус названию за совпадение с доменом начисляется после выбора домена.
+        
+        Args:
+            directory: путь к директории с файлами
+            site_name_replacer: SiteNameReplacer для поиска названий
+            hint_from_filename: подсказка из названия файла
+            
+        Returns:
+            (домен, название сайта); домен None если не найден
+        """
+        weighted_domains, priority_domains, site_name_candidates, _ = self._scan_directory(
+            directory, site_name_replacer
+        )
+        
+        domain = self.choose_domain(weighted_domains, priority_domains, hint_from_filename)
+        if not domain:
+            return None, None
+        
+        return domain, site_name_replacer.choose_site_name(site_name_candidates, domain)
+    
+    def _iter_text_files(self, directory: str) -> Iterator[os.DirEntry]:
+        """
+        Обход текстовых файлов директории через os.scandir
+        
+        Порядок тот же, что у os.walk (сначала файлы директории, затем поддиректории),
+        ссылки на директории не раскрываются. Тип записи берется из DirEntry без stat.
+        """
+        subdirs = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                elif self.is_text_file(entry.name):
+                    yield entry
+        
+        for subdir in subdirs:
+            yield from self._iter_text_files(subdir)
+    
+    def _list_text_files(self, directory: str) -> Tuple[List[str], tuple]:
+        """
+        Список текстовых файлов директории
+        
+        Returns:
+            (пути файлов в порядке обхода, сигнатура - размеры и время изменения файлов)
+        """
+        filepaths = []
+        signature = []
+        
+        for entry in self._iter_text_files(directory):
+            filepaths.append(entry.path)
+            try:
+                st = entry.stat()
+            except OSError:
+                # Битая ссылка - при чтении файл будет пропущен
+                signature.append((entry.path, -1, -1))
+                continue
+            signature.append((entry.path, st.st_size, st.st_mtime_ns))
+        
+        return filepaths, tuple(signature)
+    
+    def _map_file_chunks(self, func: Callable, filepaths: List[str], *args) -> Iterable:
+        """
+        Параллельная обработка текстовых файлов директории пачками в потоках
+        
+        Результаты возвращаются в порядке файлов, поэтому их объединение дает то же,
+        что последовательный обход (в т.ч. порядок кандидатов с равным весом).
+        Чтение файлов перекрывается с поиском. Процессы не используются: сканирование
+        запускается из потоков архивов, а пул процессов на каждый вызов дорог и требует
+        передачи детектора и SiteNameReplacer в каждую пачку.
+        """
+        chunks = [filepaths[i:i + self.SCAN_CHUNK_FILES]
+                  for i in range(0, len(filepaths), self.SCAN_CHUNK_FILES)]
+        if len(chunks) < 2:
+            return [func(chunk, *args) for chunk in chunks]
+        
+        cpu_count = os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=min(len(chunks), cpu_count * 2)) as executor:
+            return list(executor.map(func, chunks, *(repeat(arg, len(chunks)) for arg in args)))
+    
+    def _scan_directory(self, directory: str, site_name_replacer=None) -> Tuple[Counter, Dict[str, int], Counter, Counter]:
+        """
+        Сбор кандидатов в домены (и названия сайта, если передан site_name_replacer)
+        
+        Результат запоминается: пока размеры и время изменения файлов те же,
+        повторный вызов для директории (например, определение домена и статистика)
+        файлы не читает.
+        
+        Returns:
+            (домены с весами, приоритетные домены, кандидаты в названия сайта,
+             количество вхождений каждого домена)
+        """
+        filepaths, signature = self._list_text_files(directory)
+        
+        key = os.path.abspath(directory)
+        cached = self._scan_cache.get(key)
+        if (cached is not None and cached[0] == signature
+                and (site_name_replacer is None or cached[1] is site_name_replacer)):
+            result = cached[2]
+        else:
+            weighted_domains = Counter()
+            priority_domains = {}
+            site_name_candidates = Counter()
+            domain_counter = Counter()
+            
+            for partial_weighted, partial_priority, partial_names, partial_counter in self._map_file_chunks(
+                    self._scan_files, filepaths, site_name_replacer):
+                weighted_domains.update(partial_weighted)
+                for domain, weight in partial_priority.items():
+                    priority_domains[domain] = max(priority_domains.get(domain, 0), weight)
+                site_name_candidates.update(partial_names)
+                domain_counter.update(partial_counter)
+            
+            result = (weighted_domains, priority_domains, site_name_candidates, domain_counter)
+            if len(self._scan_cache) >= self.SCAN_CACHE_SIZE:
+                self._scan_cache.clear()
+            self._scan_cache[key] = (signature, site_name_replacer, result)
+        
+        # Вызывающий код может дополнять счетчики - отдаем копии
+        weighted_domains, priority_domains, site_name_candidates, domain_counter = result
+        return Counter(weighted_domains), dict(priority_domains), Counter(site_name_candidates), Counter(domain_counter)
+    
+    def _scan_files(self, filepaths: List[str], site_name_replacer=None) -> Tuple[Counter, Dict[str, int], Counter, Counter]:
+        """Сбор кандидатов по пачке файлов (выполняется в потоке)"""
         weighted_domains = Counter()
         priority_domains = {}
-        files_analyzed = 0
-        
-        # Обходим все файлы в директории
-        for root, dirs, files in os.walk(directory):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                
-                # Проверяем только текстовые файлы
-                if not self.is_text_file(filepath):
-                    continue
-                
-                # Читаем файл
-                content = self.read_file_safely(filepath)
-                if not content:
-                    continue
-                
-                files_analyzed += 1
-                file_weight = self.get_file_weight(filepath)
-                
-                # Ищем приоритетные паттерны (только в HTML/PHP файлах)
-                ext = os.path.splitext(filepath)[1].lower()
-                if ext in ['.html', '.htm', '.php']:
-                    prio_doms = self.extract_priority_domains(content)
-                    for domain, weight in prio_doms.items():
-                        priority_domains[domain] = max(priority_domains.get(domain, 0), weight)
-                
-                # Извлекаем обычные домены
-                domains = self.extract_domains_from_text(content)
-                
-                # Очищаем и валидируем с весами
-                for domain in domains:
-                    clean = self.clean_domain(domain)
-                    if self.is_valid_domain(clean):
-                        # Нормализуем к базовому домену (удаляем поддомены)
-                        base_domain = self.normalize_to_base_domain(clean)
-                        weighted_domains[base_domain] += file_weight
+        site_name_candidates = Counter()
+        domain_counter = Counter()
+        
+        # Названия сайта ищутся в декодированном тексте, домены - можно и в байтах
+        map_large = site_name_replacer is None
+        for filepath, data in zip(filepaths, self._read_many(filepaths, map_large)):
+            if isinstance(data, mmap.mmap):
+                with data:
+                    self.collect_domain_candidates(filepath, data, weighted_domains, priority_domains,
+                                                   domain_counter)
+                continue
+            
+            content = self.decode_text(data) if data is not None else None
+            if not content:
+                continue
+            
+            self.collect_domain_candidates(filepath, content, weighted_domains, priority_domains,
+                                           domain_counter)
+            # Списки текстовых расширений у детекторов совпадают
+            if site_name_replacer is not None:
+                site_name_replacer.collect_site_name_candidates(content, site_name_candidates)
+        
+        return weighted_domains, priority_domains, site_name_candidates, domain_counter
+    
+    def collect_domain_candidates(self, filepath: str, content: Union[str, bytes, mmap.mmap],
+                                  weighted_domains: Counter, priority_domains: Dict[str, int],
+                                  domain_counter: Optional[Counter] = None) -> None:
+        """
+        Поиск доменов в содержимом одного файла
+        
+        Args:
+            filepath: путь к файлу (для веса по расширению)
+            content: текст файла (или его байты / mmap)
+            weighted_domains: счетчик доменов с весами (дополняется)
+            priority_domains: домены из приоритетных паттернов (дополняется)
+            domain_counter: счетчик вхождений доменов без весов и нормализации (дополняется)
+        """
+        file_weight = self.get_file_weight(filepath)
+        
+        # Ищем приоритетные паттерны (только в HTML/PHP файлах)
+        ext = os.path.splitext(filepath)[1].lower()
+        if ext in ['.html', '.htm', '.php']:
+            prio_doms = self.extract_priority_domains(content)
+            for domain, weight in prio_doms.items():
+                priority_domains[domain] = max(priority_domains.get(domain, 0), weight)
+        
+        # Извлекаем обычные домены
+        domains = self.extract_domains_from_text(content)
+        
+        # Очищаем и валидируем с весами
+        for domain in domains:
+            clean = self.clean_domain(domain)
+            if self.is_valid_domain(clean):
+                if domain_counter is not None:
+                    domain_counter[clean] += 1
+                # Нормализуем к базовому домену (удаляем поддомены)
+                base_domain = self.normalize_to_base_domain(clean)
+                weighted_domains[base_domain] += file_weight
+    
+    def choose_domain(self, weighted_domains: Counter, priority_domains: Dict[str, int],
+                      hint_from_filename: Optional[str] = None) -> Optional[str]:
+        """
+        Выбор основного домена из собранных кандидатов
         
+        Args:
+            weighted_domains: счетчик доменов с весами
+            priority_domains: домены из приоритетных паттернов
+            hint_from_filename: подсказка из названия файла
+        """
         # Если есть подсказка из названия файла - фильтруем домены
         if hint_from_filename and len(hint_from_filename) >= 3:
             # Ищем домены, содержащие подсказку
@@ -361,24 +656,6 @@ class DomainDetector:
     
     def get_domain_statistics(self, directory: str) -> Dict[str, int]:
         """Получение статистики по всем найденным доменам"""
-        domain_counter = Counter()
-        
-        for root, dirs, files in os.walk(directory):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                
-                if not self.is_text_file(filepath):
-                    continue
-                
-                content = self.read_file_safely(filepath)
-                if not content:
-                    continue
-                
-                domains = self.extract_domains_from_text(content)
-                
-                for domain in domains:
-                    clean = self.clean_domain(domain)
-                    if self.is_valid_domain(clean):
-                        domain_counter[clean] += 1
+        _, _, _, domain_counter = self._scan_directory(directory)
         
         return dict(domain_counter)
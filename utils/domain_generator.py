@@ -1,17 +1,115 @@
 import json
+import re
 import random
-import os
-from typing import List, Set
+import hashlib
+from itertools import accumulate
+from typing import List, Set, Dict, Union
+
+
+# Гласные -> '1', остальные буквы -> '0' (для проверки серий согласных)
+_VOWEL_MASK_TABLE = str.maketrans('abcdefghijklmnopqrstuvwxyz', '10001000100000100000100000')
+
+
+class _ScalableBloomFilter:
+    """
+    Компактное множество строк (фильтр Блума) для очень большого числа доменов
+    
+    Ложноотрицательных ответов не бывает, ложноположительные редки (~1%) - для
+    генератора это лишь лишняя попытка. При заполнении добавляется новый слой
+    вдвое большей емкости, чтобы доля ложных ответов не росла.
+    """
+    
+    BITS_PER_ITEM = 10
+    HASH_COUNT = 7
+    
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self.clear()
+    
+    def clear(self) -> None:
+        # Слой: [биты, число бит, емкость, количество элементов]
+        self._layers = []
+        self._count = 0
+        self._add_layer(self._capacity)
+    
+    def _add_layer(self, capacity: int) -> None:
+        bit_count = capacity * self.BITS_PER_ITEM
+        self._layers.append([bytearray((bit_count + 7) // 8), bit_count, capacity, 0])
+    
+    def _hashes(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+    
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        for bits, bit_count, _, _ in self._layers:
+            for i in range(self.HASH_COUNT):
+                position = (h1 + i * h2) % bit_count
+                if not bits[position >> 3] & (1 << (position & 7)):
+                    break
+            else:
+                return True
+        return False
+    
+    def add(self, item: str) -> None:
+        layer = self._layers[-1]
+        if layer[3] >= layer[2]:
+            self._add_layer(layer[2] * 2)
+            layer = self._layers[-1]
+        
+        h1, h2 = self._hashes(item)
+        bits, bit_count = layer[0], layer[1]
+        for i in range(self.HASH_COUNT):
+            position = (h1 + i * h2) % bit_count
+            bits[position >> 3] |= 1 << (position & 7)
+        layer[3] += 1
+        self._count += 1
+    
+    def __len__(self) -> int:
+        return self._count
 
 
 class DomainGenerator:
     """Генератор уникальных доменных имен на основе оригинального домена"""
     
+    # Сколько случайных слов/согласных набирается одним вызовом random.choices
+    DRAW_BATCH_SIZE = 64
+    
+    # С этого числа сгенерированных доменов они хранятся в фильтре Блума вместо set
+    BLOOM_FILTER_MIN_DOMAINS = 100_000
+    
+    # Сколько наборов частей оригинальных доменов хранится (при переполнении очищается)
+    PARTS_CACHE_SIZE = 32
+    
+    # Доменная зона в конце оригинального домена
+    _ZONE_RE = re.compile(r'\.(?:com|net|org|ru|info|io|co)$')
+    
     def __init__(self, words_file: str = "data/domain_words.json"):
         """Инициализация генератора со словарем"""
         self.words_file = words_file
         self.load_dictionary()
-        self.generated_domains: Set[str] = set()
+        self.generated_domains: Union[Set[str], _ScalableBloomFilter] = set()
+        
+        # Части оригинальных доменов: оригинальный домен -> части
+        self._parts_cache: Dict[str, List[str]] = {}
+        
+        # Единственная стратегия, которой не нужны части оригинала
+        # (bound-метод сохраняется, чтобы сравнивать по is)
+        self._pure_strategy = self.strategy_pure_nutra_combination
+        
+        # Список стратегий с весами (накопленные веса - для random.choices)
+        strategies = [
+            (self.strategy_prefix_original_plus_nutra, 30),
+            (self.strategy_nutra_plus_suffix_original, 30),
+            (self._pure_strategy, 15),
+            (self.strategy_triple_combination, 10),
+            (self.strategy_reverse_mutation, 10),
+            (self.strategy_consonant_insertion, 3),
+            (self.strategy_vowel_mutation, 2)
+        ]
+        self._strategy_funcs = [strategy for strategy, _ in strategies]
+        self._strategy_cum_weights = list(accumulate(weight for _, weight in strategies))
+        self._strategy_pool: List = []
     
     def load_dictionary(self):
         """Загрузка словаря из JSON файла"""
@@ -28,58 +126,79 @@ class DomainGenerator:
             self.random_consonants = ['x', 'z', 'q', 'w', 'k']
             self.random_vowels = ['a', 'e', 'i', 'o', 'u', 'y']
             self.vowel_replacements = {}
+        
+        # Заранее набранные случайные слова и согласные (из нового словаря)
+        self._word_pool: List[str] = []
+        self._consonant_pool: List[str] = []
+    
+    def _draw_word(self) -> str:
+        """
+        Случайное Nutra-слово (как random.choice(self.short_words))
+        
+        Слова набираются пачками одним вызовом random.choices и выдаются по одному,
+        без отдельного вызова random на каждый выбор.
+        """
+        if not self._word_pool:
+            self._word_pool.extend(random.choices(self.short_words, k=self.DRAW_BATCH_SIZE))
+        return self._word_pool.pop()
+    
+    def _draw_consonant(self) -> str:
+        """Случайная согласная из словаря (набирается пачками, как в _draw_word)"""
+        if not self._consonant_pool:
+            self._consonant_pool.extend(random.choices(self.random_consonants, k=self.DRAW_BATCH_SIZE))
+        return self._consonant_pool.pop()
+    
+    def _draw_strategy(self):
+        """Стратегия генерации с учетом весов (набирается пачками, как в _draw_word)"""
+        if not self._strategy_pool:
+            self._strategy_pool.extend(random.choices(
+                self._strategy_funcs, cum_weights=self._strategy_cum_weights, k=self.DRAW_BATCH_SIZE
+            ))
+        return self._strategy_pool.pop()
     
     def extract_parts(self, domain: str) -> List[str]:
         """Извлечение частей из домена (3-6 символов)"""
-        parts = []
         length = len(domain)
+        sizes = range(3, min(7, length + 1))
         
-        # Извлекаем начало (3-6 символов)
-        for i in range(3, min(7, length + 1)):
-            parts.append(domain[:i])
+        # Начало и конец (3-6 символов); срезы берутся только по длине домена
+        parts = {domain[:i] for i in sizes}
+        parts.update(domain[-i:] for i in sizes)
         
-        # Извлекаем конец (3-6 символов)
-        for i in range(3, min(7, length + 1)):
-            parts.append(domain[-i:])
-        
-        # Извлекаем середину если домен длинный
+        # Середина если домен длинный
         if length > 6:
             mid_start = length // 3
-            for i in range(3, 7):
-                if mid_start + i <= length:
-                    parts.append(domain[mid_start:mid_start + i])
-        
-        # Удаляем дубликаты и слишком короткие
-        parts = list(set([p for p in parts if 3 <= len(p) <= 6]))
+            parts.update(domain[mid_start:mid_start + i] for i in range(3, min(7, length - mid_start + 1)))
         
-        return parts
+        # Дубликаты убраны множеством; результат кэшируется в _prepare
+        return list(parts)
     
     def strategy_prefix_original_plus_nutra(self, parts: List[str]) -> str:
         """Стратегия 1: Префикс оригинала + Nutra-слово"""
         part = random.choice(parts)
-        nutra = random.choice(self.short_words)
+        nutra = self._draw_word()
         return part + nutra
     
     def strategy_nutra_plus_suffix_original(self, parts: List[str]) -> str:
         """Стратегия 2: Nutra-слово + Суффикс оригинала"""
-        nutra = random.choice(self.short_words)
+        nutra = self._draw_word()
         part = random.choice(parts)
         return nutra + part
     
     def strategy_pure_nutra_combination(self) -> str:
         """Стратегия 3: Только Nutra-комбинации"""
-        word1 = random.choice(self.short_words)
-        word2 = random.choice(self.short_words)
+        word1 = self._draw_word()
+        word2 = self._draw_word()
         # Избегаем повторов одного и того же слова
         while word2 == word1:
-            word2 = random.choice(self.short_words)
+            word2 = self._draw_word()
         return word1 + word2
     
     def strategy_triple_combination(self, parts: List[str]) -> str:
         """Стратегия 4: Тройная комбинация"""
-        word1 = random.choice(self.short_words)
-        word2 = random.choice(self.short_words)
-        part = random.choice(parts) if parts else random.choice(self.short_words)
+        word1 = self._draw_word()
+        word2 = self._draw_word()
+        part = random.choice(parts) if parts else self._draw_word()
         
         combinations = [
             word1 + word2 + part[:3],  # Укороченная версия для длины
@@ -93,7 +212,7 @@ class DomainGenerator:
         """Стратегия 5: Обратный порядок + мутация"""
         part = random.choice(parts)
         reversed_part = part[::-1][:4]  # Берем первые 4 символа от перевернутого
-        nutra = random.choice(self.short_words)
+        nutra = self._draw_word()
         
         combinations = [
             reversed_part + nutra,
@@ -106,8 +225,8 @@ class DomainGenerator:
     def strategy_consonant_insertion(self, parts: List[str]) -> str:
         """Стратегия 6: Вставка согласных между словами"""
         part = random.choice(parts)
-        nutra = random.choice(self.short_words)
-        consonant = random.choice(self.random_consonants)
+        nutra = self._draw_word()
+        consonant = self._draw_consonant()
         
         combinations = [
             part + consonant + nutra,
@@ -120,7 +239,7 @@ class DomainGenerator:
     def strategy_vowel_mutation(self, parts: List[str]) -> str:
         """Стратегия 7: Мутация гласных"""
         part = random.choice(parts)
-        nutra = random.choice(self.short_words)
+        nutra = self._draw_word()
         
         # Мутируем гласные в части оригинала
         mutated = list(part)
@@ -144,66 +263,68 @@ class DomainGenerator:
             return False
         
         # Только буквы английского алфавита
-        if not domain.isalpha():
+        if not (domain.isascii() and domain.isalpha()):
             return False
         
+        mask = domain.lower().translate(_VOWEL_MASK_TABLE)
+        
         # Должно быть минимум 2 гласные
-        vowel_count = sum(1 for c in domain if c in 'aeiouAEIOU')
-        if vowel_count < 2:
+        if mask.count('1') < 2:
             return False
         
         # Не более 4 согласных подряд
-        consonant_streak = 0
-        for char in domain:
-            if char.lower() not in 'aeiou':
-                consonant_streak += 1
-                if consonant_streak > 4:
-                    return False
-            else:
-                consonant_streak = 0
+        if '00000' in mask:
+            return False
         
         return True
     
     def generate_domain(self, original_domain: str, zone: str) -> str:
         """Генерация одного уникального домена"""
+        return self._generate_once(self._prepare(original_domain), zone)
+    
+    def _prepare(self, original_domain: str) -> List[str]:
+        """
+        Части оригинального домена для стратегий генерации
+        
+        Результат зависит только от оригинального домена и кэшируется:
+        при генерации нескольких копий части вычисляются один раз.
+        """
+        parts = self._parts_cache.get(original_domain)
+        if parts is None:
+            if len(self._parts_cache) >= self.PARTS_CACHE_SIZE:
+                self._parts_cache.clear()
+            parts = self._parts_cache[original_domain] = self._extract_original_parts(original_domain)
+        return parts
+    
+    def _extract_original_parts(self, original_domain: str) -> List[str]:
+        """Очистка оригинального домена и извлечение его частей (без кэша)"""
         # Очищаем оригинальный домен от зоны и специальных символов
         clean_domain = original_domain.lower()
-        for ext in ['.com', '.net', '.org', '.ru', '.info', '.io', '.co']:
-            clean_domain = clean_domain.replace(ext, '')
         
         # Удаляем www и http/https
         clean_domain = clean_domain.replace('www.', '').replace('http://', '').replace('https://', '')
-        clean_domain = ''.join(c for c in clean_domain if c.isalpha())
+        
+        # Зону срезаем только в конце: "comfort.net" -> "comfort", а не "fort"
+        clean_domain = self._ZONE_RE.sub('', clean_domain)
+        clean_domain = ''.join(filter(str.isalpha, clean_domain))
         
         if len(clean_domain) < 3:
             clean_domain = "health"  # Fallback
         
         # Извлекаем части
-        parts = self.extract_parts(clean_domain)
-        
-        # Список стратегий с весами
-        strategies = [
-            (self.strategy_prefix_original_plus_nutra, 30),
-            (self.strategy_nutra_plus_suffix_original, 30),
-            (self.strategy_pure_nutra_combination, 15),
-            (self.strategy_triple_combination, 10),
-            (self.strategy_reverse_mutation, 10),
-            (self.strategy_consonant_insertion, 3),
-            (self.strategy_vowel_mutation, 2)
-        ]
-        
+        return self.extract_parts(clean_domain)
+    
+    def _generate_once(self, parts: List[str], zone: str) -> str:
+        """Генерация одного уникального домена по готовым частям оригинала"""
         # Пытаемся сгенерировать уникальный домен
         max_attempts = 50
+        pure_strategy = self._pure_strategy
         for attempt in range(max_attempts):
             # Выбираем стратегию на основе весов
-            strategy_list = []
-            for strategy, weight in strategies:
-                strategy_list.extend([strategy] * weight)
-            
-            chosen_strategy = random.choice(strategy_list)
+            chosen_strategy = self._draw_strategy()
             
             # Генерируем домен
-            if chosen_strategy == self.strategy_pure_nutra_combination:
+            if chosen_strategy is pure_strategy:
                 new_domain = chosen_strategy()
             else:
                 new_domain = chosen_strategy(parts)
@@ -213,27 +334,33 @@ class DomainGenerator:
             # Проверяем валидность и уникальность
             full_domain = new_domain + zone
             if self.validate_domain(new_domain) and full_domain not in self.generated_domains:
-                self.generated_domains.add(full_domain)
+                self._remember_domain(full_domain)
                 return full_domain
         
         # Если не удалось сгенерировать - добавляем случайные символы
         base = random.choice(parts) if parts else "health"
-        nutra = random.choice(self.short_words)
-        suffix = random.choice(self.random_consonants)
+        nutra = self._draw_word()
+        suffix = self._draw_consonant()
         fallback = (base[:4] + nutra[:4] + suffix).lower()
         
         return fallback + zone
     
+    def _remember_domain(self, full_domain: str) -> None:
+        """Запоминание сгенерированного домена (для очень большого числа - в фильтре Блума)"""
+        self.generated_domains.add(full_domain)
+        
+        if isinstance(self.generated_domains, set) and len(self.generated_domains) >= self.BLOOM_FILTER_MIN_DOMAINS:
+            bloom = _ScalableBloomFilter(len(self.generated_domains) * 2)
+            for domain in self.generated_domains:
+                bloom.add(domain)
+            self.generated_domains = bloom
+    
     def generate_domains(self, original_domain: str, count: int, zone: str) -> List[str]:
         """Генерация множества уникальных доменов"""
-        domains = []
-        
-        for i in range(count):
-            domain = self.generate_domain(original_domain, zone)
-            domains.append(domain)
+        parts = self._prepare(original_domain)
         
-        return domains
+        return [self._generate_once(parts, zone) for _ in range(count)]
     
     def reset(self):
         """Сброс кеша сгенерированных доменов"""
-        self.generated_domains.clear()
+        self.generated_domains = set()
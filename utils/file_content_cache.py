@@ -0,0 +1,111 @@
+import os
+import sys
+import threading
+from typing import Optional, Hashable, Any, Dict, Tuple
+
+
+class FileContentCache:
+    """
+    Ограниченный кеш прочитанного и декодированного содержимого файлов
+    
+    Ключ - не путь, а сам файл: устройство, inode, размер и время изменения.
+    Поэтому жесткие ссылки (копии сайта создаются ими) разделяют одну запись,
+    а перезаписанный файл (новый inode после os.replace) в кеше не находится.
+    Старые записи вытесняются, когда превышено число записей или общий размер
+    значений в памяти (декодированный текст может занимать в разы больше файла).
+    """
+    
+    # Сколько файлов хранится
+    MAX_ENTRIES = 512
+    
+    # Суммарный размер хранимых значений в памяти (у каждого процесса-воркера свой кеш)
+    MAX_BYTES = 64 * 1024 * 1024
+    
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        """
+        Инициализация кеша
+        
+        Args:
+            max_entries: предел числа записей (по умолчанию MAX_ENTRIES)
+            max_bytes: предел суммарного размера значений в памяти (по умолчанию MAX_BYTES)
+        """
+        self.max_entries = max_entries if max_entries is not None else self.MAX_ENTRIES
+        self.max_bytes = max_bytes if max_bytes is not None else self.MAX_BYTES
+        
+        # (вид содержимого, файл) -> (содержимое, его размер в памяти); порядок словаря - от давних к недавним
+        self._entries: Dict[tuple, Tuple[Any, int]] = {}
+        self._total_bytes = 0
+        # Кеш общий для потоков process_filelist
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _file_key(st: os.stat_result) -> tuple:
+        """Идентификатор содержимого файла по результату stat"""
+        # st_ctime_ns не подходит: он меняется при создании каждой жесткой ссылки
+        return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+    
+    @staticmethod
+    def _value_size(value: Any) -> int:
+        """Размер значения в памяти (для кортежа - сумма размеров элементов)"""
+        if isinstance(value, tuple):
+            return sum(sys.getsizeof(item) for item in value)
+        return sys.getsizeof(value)
+    
+    def get(self, kind: Hashable, st: os.stat_result) -> Optional[Any]:
+        """
+        Получение сохраненного содержимого
+        
+        Args:
+            kind: вид содержимого (разные классы декодируют файлы по-разному)
+            st: результат os.stat файла
+        
+        Returns:
+            сохраненное значение или None
+        """
+        key = (kind, self._file_key(st))
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            # Перемещаем в конец - запись использовалась недавно
+            self._entries[key] = entry
+        return entry[0]
+    
+    def put(self, kind: Hashable, st: os.stat_result, value: Any) -> None:
+        """
+        Сохранение содержимого файла
+        
+        Значения, которые в памяти больше всего кеша, не сохраняются.
+        
+        Args:
+            kind: вид содержимого
+            st: результат os.stat файла, по которому содержимое прочитано
+            value: значение для сохранения
+        """
+        size = self._value_size(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        
+        key = (kind, self._file_key(st))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+            
+            # Вытесняем самые давние записи
+            while self._entries and (len(self._entries) >= self.max_entries
+                                     or self._total_bytes + size > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._total_bytes -= self._entries.pop(oldest)[1]
+            
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+    
+    def clear(self) -> None:
+        """Очистка кеша"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
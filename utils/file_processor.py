@@ -1,14 +1,55 @@
 import os
 import re
-from typing import Optional
-from charset_normalizer import from_path
+import mmap
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Optional, List, Tuple, Dict, Union, Iterable
+
+from .archive_handler import iter_files
+from .file_content_cache import FileContentCache
+from .text_decoding import decode_bytes
 
 
 class FileProcessor:
     """Обработчик файлов для замены доменов"""
     
-    def __init__(self):
-        """Инициализация процессора"""
+    # Файлы крупнее этого размера сначала проверяются через mmap, без чтения и декодирования
+    MMAP_THRESHOLD = 256 * 1024
+    
+    # ASCII-файлы крупнее этого размера обрабатываются потоком через mmap,
+    # частями по STREAM_CHUNK_SIZE, а не читаются в память целиком
+    STREAM_THRESHOLD = 16 * 1024 * 1024
+    STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+    
+    # Сколько наборов подготовленных замен хранится (при переполнении очищается)
+    PATTERN_CACHE_SIZE = 32
+    
+    # Префиксы перед доменом, с которых может начаться совпадение (кроме самого домена),
+    # по последнему символу: перед большинством вхождений домена нет ни одного из них
+    _DOMAIN_PREFIXES = {
+        '/': ('https://', 'http://'),
+        '.': ('https://www.', 'http://www.', 'www.'),
+        '@': ('@',),
+    }
+    _DOMAIN_PREFIXES_BYTES = {
+        ord(char): tuple(prefix.encode('ascii') for prefix in prefixes)
+        for char, prefixes in _DOMAIN_PREFIXES.items()
+    }
+    _DOMAIN_PREFIX_MAX_LENGTH = len('https://www.')
+    
+    # Не-ASCII символы, которые без учета регистра совпадают с латинскими буквами (İ, ı, ſ, K)
+    _CASEFOLD_CHARS = ('\u0130', '\u0131', '\u017f', '\u212a')
+    
+    def __init__(self, content_cache: Optional[FileContentCache] = None):
+        """
+        Инициализация процессора
+        
+        Args:
+            content_cache: кеш содержимого файлов (копии сайта - жесткие ссылки
+                           на одни и те же файлы, и каждый из них декодируется один раз)
+        """
         # Расширения текстовых файлов для обработки
         self.text_extensions = {
             '.html', '.htm', '.php', '.css', '.js', '.txt',
@@ -23,13 +64,31 @@ class FileProcessor:
             '.pdf', '.doc', '.docx', '.xls', '.xlsx',
             '.zip', '.rar', '.7z', '.tar', '.gz',
             '.mp3', '.mp4', '.avi', '.mov', '.flv',
-            '.exe', '.dll', '.so', '.dylib'
+            '.exe', '.dll', '.so', '.dylib',
+            '.webp', '.woff', '.woff2', '.ttf', '.otf', '.eot'
         }
+        
+        # Подготовленные замены: (домены, названия) -> результат _compile_replacements
+        self._replacements_cache: Dict[tuple, dict] = {}
+        
+        # Выражения замены вариантов названия: (старое, новое) -> [(выражение, новый вариант)]
+        self._name_variant_cache: Dict[Tuple[str, str], list] = {}
+        
+        self.content_cache = content_cache
     
-    def is_text_file(self, filepath: str) -> bool:
-        """Проверка, является ли файл текстовым"""
-        _, ext = os.path.splitext(filepath)
-        ext_lower = ext.lower()
+    def is_text_file(self, filepath: str, size: Optional[int] = None) -> bool:
+        """
+        Проверка, является ли файл текстовым
+        
+        Args:
+            filepath: путь к файлу
+            size: размер файла, если уже известен (пустой файл не открывается)
+        """
+        # Расширение - по последней точке имени: у ".htaccess" и ".env" это все имя
+        # (os.path.splitext вернул бы пустое), и файл не приходится открывать
+        name = os.path.basename(filepath)
+        dot = name.rfind('.')
+        ext_lower = name[dot:].lower() if dot >= 0 else ''
         
         # Если явно бинарный - пропускаем
         if ext_lower in self.binary_extensions:
@@ -39,16 +98,26 @@ class FileProcessor:
         if ext_lower in self.text_extensions:
             return True
         
+        # В пустом файле нулевых байтов нет - читать нечего
+        if size == 0:
+            return True
+        
         # Для неизвестных расширений - пробуем определить
+        # (os.open/os.read без буферизованного файлового объекта - нужны лишь 512 байт)
         try:
-            with open(filepath, 'rb') as f:
-                chunk = f.read(512)
-                # Проверяем наличие нулевых байтов (признак бинарного файла)
-                if b'\x00' in chunk:
-                    return False
-            return True
+            fd = os.open(filepath, os.O_RDONLY)
         except Exception:
             return False
+        
+        try:
+            chunk = os.read(fd, 512)
+        except Exception:
+            return False
+        finally:
+            os.close(fd)
+        
+        # Проверяем наличие нулевых байтов (признак бинарного файла)
+        return b'\x00' not in chunk
     
     def read_file_with_encoding(self, filepath: str) -> tuple:
         """
@@ -57,26 +126,23 @@ class FileProcessor:
         Returns:
             (content, encoding) или (None, None) при ошибке
         """
-        # Пробуем определить кодировку
         try:
-            result = from_path(filepath).best()
-            if result:
-                encoding = result.encoding
-                content = str(result)
-                return content, encoding
+            with open(filepath, 'rb') as f:
+                data = f.read()
         except Exception:
-            pass
+            return None, None
         
-        # Fallback - пробуем популярные кодировки
-        for encoding in ['utf-8', 'cp1251', 'latin1', 'ascii', 'windows-1252']:
-            try:
-                with open(filepath, 'r', encoding=encoding) as f:
-                    content = f.read()
-                return content, encoding
-            except Exception:
-                continue
+        return self.decode_bytes(data)
+    
+    def decode_bytes(self, data: bytes) -> tuple:
+        """
+        Декодирование уже прочитанного содержимого файла с определением кодировки
         
-        return None, None
+        Returns:
+            (content, encoding) или (None, None) при ошибке
+        """
+        # BOM остается в тексте и при записи сохраняется
+        return decode_bytes(data)
     
     def replace_domain_in_text(self, text: str, old_domain: str, new_domain: str) -> tuple:
         """
@@ -90,46 +156,228 @@ class FileProcessor:
         Returns:
             (modified_text, replacements_count)
         """
+        # Все формы домена заменяются одним проходом общего выражения (см. _compile_replacements)
+        modified_text, replacements, _ = self._apply_replacements(
+            text, self._compile_replacements(old_domain, new_domain)
+        )
+        
+        return modified_text, replacements
+    
+    def _site_name_variants(self, old_name: str, new_name: str) -> List[Tuple[str, str]]:
+        """Варианты названия в разных регистрах (без дубликатов)"""
+        variants = [
+            (old_name, new_name),
+            (old_name.lower(), new_name.lower()),
+            (old_name.upper(), new_name.upper()),
+            (old_name.capitalize(), new_name.capitalize()),
+            (old_name.title(), new_name.title()),  # Title Case
+        ]
+        
+        return list(dict.fromkeys(variants))
+    
+    def _compile_replacements(self, old_domain: str, new_domain: str,
+                              old_site_name: str = None, new_site_name: str = None) -> dict:
+        """
+        Подготовка всех замен для одной копии сайта
+        
+        Все формы домена и все варианты названия объединяются в одно регулярное
+        выражение: файл просматривается за один проход, а выражение компилируется
+        один раз на копию, а не для каждого файла (результат кэшируется).
+        
+        Returns:
+            dict для _apply_replacements:
+                pattern - общее выражение для замены в тексте
+                domain - замены для форм домена (по имени группы)
+                names - замены для вариантов названия
+                probe - байтовое выражение для быстрой проверки наличия совпадений
+                        (None, если название не ASCII и проверку по байтам сделать нельзя)
+                literal - домен в нижнем регистре для поиска начал совпадений
+                          (None, если домен не ASCII - тогда замена только через выражение)
+                domain_search - выражение для поиска самого домена без учета регистра
+                bytes - те же pattern/domain/names/literal для замены прямо в байтах
+                        ASCII-файлов (None, если домены или названия не ASCII)
+        """
+        key = (old_domain, new_domain, old_site_name, new_site_name)
+        replacements = self._replacements_cache.get(key)
+        if replacements is None:
+            if len(self._replacements_cache) >= self.PATTERN_CACHE_SIZE:
+                self._replacements_cache.clear()
+            replacements = self._replacements_cache[key] = self._build_replacements(*key)
+        return replacements
+    
+    def _build_replacements(self, old_domain: str, new_domain: str,
+                            old_site_name: Optional[str], new_site_name: Optional[str]) -> dict:
+        """Подготовка замен для копии сайта без кэша"""
         # Очищаем домены от www и протокола для надежности
         old_clean = old_domain.replace('www.', '').replace('http://', '').replace('https://', '')
         new_clean = new_domain.replace('www.', '').replace('http://', '').replace('https://', '')
+        escaped = re.escape(old_clean)
         
-        # Извлекаем части нового домена (имя и зона)
-        new_parts = new_clean.split('.')
-        if len(new_parts) >= 2:
-            new_name = '.'.join(new_parts[:-1])  # все кроме последней части
-            new_zone = new_parts[-1]  # последняя часть (.com, .info и т.д.)
-        else:
-            new_name = new_clean
-            new_zone = ''
+        # Формы домена (от более специфичных к общим), без учета регистра
+        alternatives = [
+            r'(?P<proto>(?i:https?://(?:www\.)?' + escaped + r'))',
+            r'(?P<www>(?i:\bwww\.' + escaped + r'))',
+            r'(?P<bare>(?i:\b' + escaped + r'\b))',
+            r'(?P<email>(?i:@' + escaped + r'))',
+        ]
+        domain_replacements = {
+            'proto': f"https://{new_clean}",
+            'www': f"www.{new_clean}",
+            'bare': new_clean,
+            'email': f"@{new_clean}",
+        }
         
-        replacements = 0
-        modified_text = text
+        # Варианты названия сайта - с учетом регистра
+        name_replacements = {}
+        if old_site_name and new_site_name:
+            for old_variant, new_variant in self._site_name_variants(old_site_name, new_site_name):
+                if old_variant != new_variant:
+                    name_replacements.setdefault(old_variant, new_variant)
         
-        # Паттерны для замены (от более специфичных к общим)
-        patterns = [
-            # 1. С протоколом https://
-            (re.compile(r'https?://(www\.)?' + re.escape(old_clean), re.IGNORECASE),
-             lambda m: f"https://{new_clean}"),
-            
-            # 2. С www.
-            (re.compile(r'\bwww\.' + re.escape(old_clean), re.IGNORECASE),
-             lambda m: f"www.{new_clean}"),
-            
-            # 3. Просто домен в разных контекстах
-            (re.compile(r'\b' + re.escape(old_clean) + r'\b', re.IGNORECASE),
-             lambda m: new_clean),
+        if name_replacements:
+            names = sorted(name_replacements, key=len, reverse=True)
+            alternatives.append(r'(?P<name>\b(?:' + '|'.join(re.escape(n) for n in names) + r')\b)')
+        
+        # Быстрая проверка по байтам: домен и название ищутся без границ слов,
+        # поэтому она находит все, что найдет основное выражение (и возможно больше)
+        probe = None
+        probe_names = list(name_replacements)
+        if old_clean.isascii() and all(name.isascii() for name in probe_names):
+            probe_alternatives = [b'(?i:' + re.escape(old_clean.encode('ascii')) + b')']
+            probe_alternatives.extend(re.escape(name.encode('ascii')) for name in probe_names)
+            probe = re.compile(b'|'.join(probe_alternatives))
+        
+        # Для ASCII-файлов замена идет прямо в байтах, без декодирования и кодирования
+        bytes_replacements = None
+        if old_clean.isascii() and new_clean.isascii() \
+                and all(old.isascii() and new.isascii() for old, new in name_replacements.items()):
+            bytes_replacements = {
+                'pattern': re.compile('|'.join(alternatives).encode('ascii')),
+                'domain': {group: value.encode('ascii') for group, value in domain_replacements.items()},
+                'names': {old.encode('ascii'): new.encode('ascii') for old, new in name_replacements.items()},
+                'literal': old_clean.lower().encode('ascii') if old_clean else None,
+            }
+        
+        return {
+            'pattern': re.compile('|'.join(alternatives)),
+            'domain': domain_replacements,
+            'names': name_replacements,
+            'probe': probe,
+            'literal': old_clean.lower() if old_clean and old_clean.isascii() else None,
+            'domain_search': re.compile(escaped, re.IGNORECASE),
+            'bytes': bytes_replacements,
+        }
+    
+    def _apply_replacements(self, text: str, replacements: dict) -> tuple:
+        """
+        Замена домена и названия за один проход по тексту
+        
+        Args:
+            text: исходный текст (или байты ASCII-файла, если replacements['bytes'] задан)
+            replacements: результат _compile_replacements
             
-            # 4. В email адресах (@domain.com)
-            (re.compile(r'@' + re.escape(old_clean), re.IGNORECASE),
-             lambda m: f"@{new_clean}"),
-        ]
+        Returns:
+            (modified_text, domain_replacements_count, name_replacements_count)
+        """
+        if isinstance(text, bytes):
+            replacements = replacements['bytes']
         
-        for pattern, replacement in patterns:
-            modified_text, count = pattern.subn(replacement, modified_text)
-            replacements += count
+        domain_replacements = replacements['domain']
+        name_replacements = replacements['names']
+        counts = {'domain': 0, 'name': 0}
         
-        return modified_text, replacements
+        def substitute(match):
+            if match.lastgroup == 'name':
+                counts['name'] += 1
+                return name_replacements[match.group()]
+            counts['domain'] += 1
+            return domain_replacements[match.lastgroup]
+        
+        starts = self._candidate_starts(text, replacements)
+        if starts is None:
+            # Любое совпадение содержит домен или название: если их нет, общее
+            # выражение по всему тексту не запускаем (поиск одной строки намного дешевле)
+            if replacements['domain_search'].search(text) is None \
+                    and not any(name in text for name in name_replacements):
+                return text, 0, 0
+            modified_text = replacements['pattern'].sub(substitute, text)
+            return modified_text, counts['domain'], counts['name']
+        
+        # Выражение проверяется только там, где может начаться совпадение, - слева
+        # направо и с пропуском уже замененного, как это делает sub. Замена берется
+        # прямо по группе совпадения, без вызова substitute на каждое совпадение
+        match_at = replacements['pattern'].match
+        pieces = []
+        pos = 0
+        domain_count = name_count = 0
+        for start in starts:
+            if start < pos:
+                continue
+            match = match_at(text, start)
+            if match is None:
+                continue
+            pieces.append(text[pos:start])
+            group = match.lastgroup
+            if group == 'name':
+                name_count += 1
+                pieces.append(name_replacements[match.group()])
+            else:
+                domain_count += 1
+                pieces.append(domain_replacements[group])
+            pos = match.end()
+        
+        if not pieces:
+            return text, 0, 0
+        
+        pieces.append(text[pos:])
+        return text[:0].join(pieces), domain_count, name_count
+    
+    def _candidate_starts(self, text: str, replacements: dict) -> Optional[List[int]]:
+        """
+        Позиции, с которых может начаться совпадение общего выражения
+        
+        Каждая форма домена заканчивается самим доменом, а название ищется
+        как есть, поэтому все начала находятся поиском подстрок (str.find
+        работает намного быстрее прохода выражения по каждой позиции).
+        
+        Returns:
+            отсортированный список позиций или None, если поиск подстрок
+            не эквивалентен выражению (домен не ASCII или в тексте есть символы,
+            совпадающие с латиницей без учета регистра)
+        """
+        literal = replacements['literal']
+        if literal is None:
+            return None
+        # В байтах регистр учитывается только для ASCII - как и в lower()
+        if isinstance(text, str) and not text.isascii() \
+                and any(char in text for char in self._CASEFOLD_CHARS):
+            return None
+        
+        starts = set()
+        
+        # Без особых символов lower() не меняет длину текста - позиции совпадают
+        lower_text = text.lower()
+        prefixes = self._DOMAIN_PREFIXES if isinstance(text, str) else self._DOMAIN_PREFIXES_BYTES
+        index = lower_text.find(literal)
+        while index >= 0:
+            starts.add(index)
+            # Началами считаем только префиксы, которые действительно стоят перед доменом;
+            # по предыдущему символу сразу отбрасываются все остальные
+            candidates = prefixes.get(lower_text[index - 1]) if index else None
+            if candidates:
+                before = lower_text[max(index - self._DOMAIN_PREFIX_MAX_LENGTH, 0):index]
+                for prefix in candidates:
+                    if before.endswith(prefix):
+                        starts.add(index - len(prefix))
+            index = lower_text.find(literal, index + 1)
+        
+        for name in replacements['names']:
+            index = text.find(name)
+            while index >= 0:
+                starts.add(index)
+                index = text.find(name, index + 1)
+        
+        return sorted(starts)
     
     def replace_site_name_in_text(self, text: str, old_name: str, new_name: str) -> tuple:
         """
@@ -149,29 +397,32 @@ class FileProcessor:
         replacements = 0
         modified_text = text
         
-        # Создаем варианты в разных регистрах
-        variants = [
-            (old_name, new_name),
-            (old_name.lower(), new_name.lower()),
-            (old_name.upper(), new_name.upper()),
-            (old_name.capitalize(), new_name.capitalize()),
-            (old_name.title(), new_name.title()),  # Title Case
-        ]
-        
-        # Убираем дубликаты
-        variants = list(set(variants))
-        
-        for old_variant, new_variant in variants:
-            if old_variant == new_variant:
-                continue
-            
-            # Используем word boundaries для точной замены
-            pattern = re.compile(r'\b' + re.escape(old_variant) + r'\b')
+        for pattern, new_variant in self._compile_name_variants(old_name, new_name):
             modified_text, count = pattern.subn(new_variant, modified_text)
             replacements += count
         
         return modified_text, replacements
     
+    def _compile_name_variants(self, old_name: str, new_name: str) -> List[Tuple[re.Pattern, str]]:
+        """
+        Выражения замены вариантов названия (компилируются один раз на пару названий)
+        
+        Returns:
+            список (выражение, новый вариант) в порядке применения
+        """
+        key = (old_name, new_name)
+        compiled = self._name_variant_cache.get(key)
+        if compiled is None:
+            if len(self._name_variant_cache) >= self.PATTERN_CACHE_SIZE:
+                self._name_variant_cache.clear()
+            # Используем word boundaries для точной замены
+            compiled = self._name_variant_cache[key] = [
+                (re.compile(r'\b' + re.escape(old_variant) + r'\b'), new_variant)
+                for old_variant, new_variant in self._site_name_variants(old_name, new_name)
+                if old_variant != new_variant
+            ]
+        return compiled
+    
     def process_file(self, filepath: str, old_domain: str, new_domain: str, 
                     old_site_name: str = None, new_site_name: str = None) -> dict:
         """
@@ -187,6 +438,42 @@ class FileProcessor:
         Returns:
             dict с результатами: {'success': bool, 'replacements': int, 'name_replacements': int, 'error': str}
         """
+        # Проверяем, текстовый ли файл
+        if not self.is_text_file(filepath):
+            return {
+                'success': True,
+                'replacements': 0,
+                'name_replacements': 0,
+                'error': 'binary_file_skipped'
+            }
+        
+        replacements = self._compile_replacements(old_domain, new_domain, old_site_name, new_site_name)
+        return self._process_text_file(filepath, replacements)
+    
+    def _may_contain_replacements(self, data, probe) -> bool:
+        """
+        Быстрая проверка по байтам (bytes или mmap), встречаются ли домен или название
+        
+        Содержимое не декодируется. Для UTF-16 файлов (по BOM или, без BOM,
+        по нулевым байтам - как в decode_bytes) побайтовая проверка неприменима -
+        считаем, что совпадения возможны.
+        """
+        if data[:2] in (b'\xff\xfe', b'\xfe\xff') or data.find(b'\x00') >= 0:
+            return True
+        return probe.search(data) is not None
+    
+    def _process_text_file(self, filepath: str, replacements: dict, size: Optional[int] = None) -> dict:
+        """
+        Замена домена и названия в файле, который уже признан текстовым
+        
+        Файлы без совпадений не декодируются и не перезаписываются
+        (у копии сохраняется жесткая ссылка на оригинал).
+        
+        Args:
+            filepath: путь к файлу
+            replacements: подготовленные замены (см. _compile_replacements)
+            size: размер файла, если уже известен
+        """
         result = {
             'success': False,
             'replacements': 0,
@@ -195,37 +482,44 @@ class FileProcessor:
         }
         
         try:
-            # Проверяем, текстовый ли файл
-            if not self.is_text_file(filepath):
-                result['success'] = True
-                result['error'] = 'binary_file_skipped'
-                return result
+            cached = st = None
+            if self.content_cache is not None:
+                st = os.stat(filepath)
+                size = st.st_size
+                cached = self.content_cache.get('file_processor', st)
+            elif size is None:
+                size = os.path.getsize(filepath)
             
-            # Читаем файл
-            content, encoding = self.read_file_with_encoding(filepath)
+            if cached is not None:
+                # Файл уже декодирован (для другой копии) - не читаем его снова
+                content, encoding = cached
+                if encoding is None and replacements['bytes'] is None:
+                    content, encoding = content.decode('ascii'), 'utf-8'
+            else:
+                if size > self.STREAM_THRESHOLD and replacements['bytes'] is not None:
+                    streamed = self._process_mapped_file(filepath, replacements)
+                    if streamed is not None:
+                        return streamed
+                
+                content, encoding = self._read_text_content(filepath, replacements, size, st)
+                if content is False:
+                    result['success'] = True
+                    return result
             
             if content is None:
                 result['error'] = 'cannot_read_file'
                 return result
             
-            # Заменяем домен
-            modified_content, replacements = self.replace_domain_in_text(content, old_domain, new_domain)
-            result['replacements'] = replacements
-            
-            # Заменяем название сайта (если указано)
-            if old_site_name and new_site_name:
-                modified_content, name_replacements = self.replace_site_name_in_text(
-                    modified_content, old_site_name, new_site_name
-                )
-                result['name_replacements'] = name_replacements
+            # Заменяем домен и название сайта за один проход
+            modified_content, domain_count, name_count = self._apply_replacements(content, replacements)
+            result['replacements'] = domain_count
+            result['name_replacements'] = name_count
             
-        # Записываем обратно только если были изменения
-            total_changes = replacements + result['name_replacements']
+            # Записываем обратно только если были изменения
+            total_changes = domain_count + name_count
             if total_changes > 0:
                 try:
-                    with open(filepath, 'w', encoding=encoding or 'utf-8') as f:
-                        f.write(modified_content)
-                    
+                    self._write_file(filepath, modified_content, encoding or 'utf-8')
                     result['success'] = True
                 except Exception as e:
                     result['error'] = f'cannot_write_file: {str(e)}'
@@ -237,20 +531,236 @@ class FileProcessor:
         
         return result
     
+    def _process_mapped_file(self, filepath: str, replacements: dict) -> Optional[dict]:
+        """
+        Потоковая замена в крупном ASCII-файле через mmap
+        
+        Файл не читается в память: совпадения ищутся по частям отображения,
+        а результат пишется во временный файл кусками между совпадениями.
+        Результат тот же, что при замене по байтам всего файла.
+        
+        Returns:
+            dict с результатами (как _process_text_file) или None, если файл
+            не ASCII (или в нем есть нулевые байты) - тогда он обрабатывается целиком
+        """
+        byte_replacements = replacements['bytes']
+        if byte_replacements['literal'] is None:
+            return None
+        
+        result = {
+            'success': False,
+            'replacements': 0,
+            'name_replacements': 0,
+            'error': None
+        }
+        
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b'\x00') >= 0 or not all(
+                mm[offset:offset + self.STREAM_CHUNK_SIZE].isascii()
+                for offset in range(0, len(mm), self.STREAM_CHUNK_SIZE)
+            ):
+                return None
+            
+            probe = replacements['probe']
+            if probe is not None and not self._may_contain_replacements(mm, probe):
+                result['success'] = True
+                return result
+            
+            matches = self._iter_mapped_matches(mm, byte_replacements)
+            first = next(matches, None)
+            if first is None:
+                result['success'] = True
+                return result
+            
+            domain_replacements = byte_replacements['domain']
+            name_replacements = byte_replacements['names']
+            
+            chunk_size = self.STREAM_CHUNK_SIZE
+            
+            def copy_range(start, end):
+                # Длинный текст без совпадений копируется частями - не больше chunk_size за раз
+                for offset in range(start, end, chunk_size):
+                    yield mm[offset:min(offset + chunk_size, end)]
+            
+            def pieces():
+                # Короткие куски и замены собираются и пишутся блоками около chunk_size
+                buffered = []
+                pos = flushed = 0
+                for match in chain((first,), matches):
+                    start = match.start()
+                    if start - pos > chunk_size:
+                        yield b''.join(buffered)
+                        buffered = []
+                        yield from copy_range(pos, start)
+                        flushed = start
+                    else:
+                        buffered.append(mm[pos:start])
+                    if match.lastgroup == 'name':
+                        result['name_replacements'] += 1
+                        buffered.append(name_replacements[match.group()])
+                    else:
+                        result['replacements'] += 1
+                        buffered.append(domain_replacements[match.lastgroup])
+                    pos = match.end()
+                    if pos - flushed >= chunk_size:
+                        yield b''.join(buffered)
+                        buffered = []
+                        flushed = pos
+                yield b''.join(buffered)
+                yield from copy_range(pos, len(mm))
+            
+            try:
+                self._write_file(filepath, pieces(), None)
+                result['success'] = True
+            except Exception as e:
+                result['error'] = f'cannot_write_file: {str(e)}'
+        
+        return result
+    
+    def _iter_mapped_matches(self, mm: mmap.mmap, byte_replacements: dict):
+        """
+        Совпадения общего выражения в отображенном файле - по порядку, как у sub
+        
+        Начала совпадений ищутся в окнах по STREAM_CHUNK_SIZE байт (с запасом на
+        префикс и сам домен или название), выражение проверяется по всему файлу.
+        """
+        match_at = byte_replacements['pattern'].match
+        chunk_size = self.STREAM_CHUNK_SIZE
+        # С этим запасом домен или название для любого начала внутри части целиком попадает в окно
+        overlap = self._DOMAIN_PREFIX_MAX_LENGTH + max(
+            [len(byte_replacements['literal'])] + [len(name) for name in byte_replacements['names']]
+        )
+        
+        pos = 0
+        for offset in range(0, len(mm), chunk_size):
+            window = mm[offset:offset + chunk_size + overlap]
+            for start in self._candidate_starts(window, byte_replacements):
+                # Начала из запаса относятся к следующей части
+                if start >= chunk_size:
+                    break
+                start += offset
+                if start < pos:
+                    continue
+                match = match_at(mm, start)
+                if match is None:
+                    continue
+                yield match
+                pos = match.end()
+    
+    def _read_text_content(self, filepath: str, replacements: dict, size: int,
+                           st: Optional[os.stat_result] = None) -> tuple:
+        """
+        Чтение и декодирование файла для замены
+        
+        Args:
+            filepath: путь к файлу
+            replacements: подготовленные замены (см. _compile_replacements)
+            size: размер файла
+            st: результат os.stat файла - тогда декодированное содержимое сохраняется в кеше
+            
+        Returns:
+            (content, encoding); content - bytes для ASCII-файлов (encoding None),
+            False - если совпадений в файле точно нет, None - если файл не декодируется
+        """
+        probe = replacements['probe']
+        
+        # Крупный файл сначала проверяем через mmap, не читая его в память
+        if probe is not None and size > self.MMAP_THRESHOLD:
+            with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if not self._may_contain_replacements(mm, probe):
+                    return False, None
+        
+        # Читаем файл один раз: проверка по байтам, затем декодирование того же буфера
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        
+        if probe is not None and size <= self.MMAP_THRESHOLD \
+                and not self._may_contain_replacements(data, probe):
+            return False, None
+        
+        if data.isascii() and b'\x00' not in data:
+            # ASCII-файл: его текст совпадает с байтами, замена идет без декодирования.
+            # В кеше он хранится байтами - подходит и для замен по байтам, и по тексту
+            decoded = data, None
+            if st is not None:
+                self.content_cache.put('file_processor', st, decoded)
+            if replacements['bytes'] is None:
+                decoded = data.decode('ascii'), 'utf-8'
+            return decoded
+        
+        decoded = self.decode_bytes(data)
+        if st is not None and decoded[0] is not None:
+            self.content_cache.put('file_processor', st, decoded)
+        return decoded
+    
+    def _write_file(self, filepath: str, content: Union[str, bytes, Iterable[bytes]], encoding: Optional[str]):
+        """
+        Запись содержимого файла (байты записываются как есть, без encoding;
+        итерируемое по частям - байтами, кусок за куском)
+        
+        Запись всегда идет во временный файл в той же директории, который затем
+        атомарно заменяет исходный (os.replace). Так файл не остается обрезанным,
+        если запись прервалась (например, текст не кодируется в кодировке файла),
+        а жесткая ссылка (копия сайта ссылается на оригинал) разрывается -
+        иначе изменения попали бы во все копии сразу.
+        """
+        if isinstance(content, str):
+            mode = 'w'
+        else:
+            mode, encoding = 'wb', None
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode, encoding=encoding) as f:
+                if isinstance(content, (str, bytes)):
+                    f.write(content)
+                else:
+                    f.writelines(content)
+            shutil.copymode(filepath, tmp_path)
+            os.replace(tmp_path, filepath)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _iter_dirs_bottom_up(self, directory: str):
+        """
+        Обход поддиректорий через os.scandir снизу вверх (как os.walk с topdown=False)
+        
+        Вложенные папки выдаются раньше содержащих их, ссылки на директории
+        выдаются, но не раскрываются. Тип записи берется из DirEntry без stat.
+        
+        Yields:
+            (путь к папке, имя папки)
+        """
+        try:
+            with os.scandir(directory) as it:
+                subdirs = [entry for entry in it if entry.is_dir()]
+        except OSError:
+            # Как os.walk: нечитаемая директория пропускается
+            return
+        
+        for entry in subdirs:
+            if not entry.is_symlink():
+                yield from self._iter_dirs_bottom_up(entry.path)
+        
+        for entry in subdirs:
+            yield entry.path, entry.name
+    
     def rename_directories(self, directory: str, old_name: str, new_name: str) -> int:
         """Переименование папок содержащих старое название"""
         if not old_name or not new_name:
             return 0
         
         renamed_count = 0
-        dirs_to_rename = []
         
         # Собираем папки снизу вверх
-        for root, dirs, files in os.walk(directory, topdown=False):
-            for dirname in dirs:
-                if old_name.lower() in dirname.lower():
-                    dir_path = os.path.join(root, dirname)
-                    dirs_to_rename.append((dir_path, dirname))
+        old_lower = old_name.lower()
+        dirs_to_rename = [
+            (dir_path, dirname)
+            for dir_path, dirname in self._iter_dirs_bottom_up(directory)
+            if old_lower in dirname.lower()
+        ]
         
         # Переименовываем
         for dir_path, dirname in dirs_to_rename:
@@ -275,8 +785,38 @@ class FileProcessor:
         
         return renamed_count
     
+    def describe_file(self, directory: str, filepath: str) -> Tuple[str, int, bool]:
+        """
+        Описание одного файла для списка файлов
+        
+        Returns:
+            (относительный путь, размер, текстовый ли файл)
+        """
+        size = os.path.getsize(filepath)
+        return os.path.relpath(filepath, directory), size, self.is_text_file(filepath, size)
+    
+    def list_files(self, directory: str) -> List[Tuple[str, Optional[int], bool]]:
+        """
+        Составление списка файлов директории за один обход
+        
+        Список можно переиспользовать для всех копий одного сайта: структура
+        и содержимое файлов у копий одинаковые до замены.
+        
+        Файл, для которого stat не удался (битая ссылка), остается в списке с размером
+        None: при обработке он, как и остальные ошибки чтения, попадает в статистику.
+        
+        Returns:
+            список (относительный путь, размер, текстовый ли файл)
+        """
+        return [
+            (rel_path, st.st_size if st is not None else None,
+             self.is_text_file(file_path, st.st_size if st is not None else None))
+            for rel_path, file_path, st in iter_files(directory)
+        ]
+    
     def process_directory(self, directory: str, old_domain: str, new_domain: str, 
-                         old_site_name: str = None, new_site_name: str = None) -> dict:
+                         old_site_name: str = None, new_site_name: str = None,
+                         max_workers: Optional[int] = None) -> dict:
         """
         Обработка всей директории - замена домена и названия сайта во всех файлах
         
@@ -286,6 +826,42 @@ class FileProcessor:
             new_domain: новый домен
             old_site_name: старое название сайта (опционально)
             new_site_name: новое название сайта (опционально)
+            max_workers: число потоков для обработки файлов (по умолчанию - вдвое больше CPU)
+            
+        Returns:
+            dict со статистикой обработки
+        """
+        if max_workers is None:
+            max_workers = (os.cpu_count() or 1) * 2
+        
+        return self.process_filelist(
+            self.list_files(directory), directory, old_domain, new_domain, old_site_name, new_site_name,
+            max_workers=max_workers
+        )
+    
+    def process_filelist(self, file_list: List[Tuple[str, int, bool]], directory: str,
+                         old_domain: str, new_domain: str,
+                         old_site_name: str = None, new_site_name: str = None,
+                         max_workers: int = 1) -> dict:
+        """
+        Обработка файлов по заранее составленному списку (см. list_files)
+        
+        Сначала заменяется содержимое файлов (пути из списка еще актуальны),
+        затем переименовываются папки с названием сайта.
+        
+        Файлы независимы, поэтому при max_workers > 1 они обрабатываются в потоках:
+        чтение и запись одних файлов перекрываются с поиском в других. Копии сайтов
+        в BatchProcessor и так создаются в отдельных процессах - там файлы
+        обрабатываются последовательно.
+        
+        Args:
+            file_list: список (относительный путь, размер, текстовый ли файл)
+            directory: директория, относительно которой заданы пути
+            old_domain: старый домен
+            new_domain: новый домен
+            old_site_name: старое название сайта (опционально)
+            new_site_name: новое название сайта (опционально)
+            max_workers: число потоков для обработки файлов
             
         Returns:
             dict со статистикой обработки
@@ -301,31 +877,43 @@ class FileProcessor:
             'errors': []
         }
         
-        # Сначала переименовываем папки если есть название
+        # Замены компилируются один раз для всех файлов копии
+        replacements = self._compile_replacements(old_domain, new_domain, old_site_name, new_site_name)
+        
+        # Бинарные файлы пропускаем без чтения
+        text_files = []
+        for relpath, size, is_text in file_list:
+            stats['total_files'] += 1
+            if is_text:
+                text_files.append((os.path.join(directory, relpath), size))
+            else:
+                stats['skipped_files'] += 1
+        
+        def process(item: Tuple[str, int]) -> dict:
+            filepath, size = item
+            return self._process_text_file(filepath, replacements, size)
+        
+        # Результаты собираются в порядке файлов (и ошибки в статистике - тоже)
+        if max_workers > 1 and len(text_files) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(text_files))) as executor:
+                results = list(executor.map(process, text_files))
+        else:
+            results = map(process, text_files)
+        
+        for (filepath, _), result in zip(text_files, results):
+            if result['success']:
+                stats['processed_files'] += 1
+                stats['total_replacements'] += result['replacements']
+                stats['total_name_replacements'] += result.get('name_replacements', 0)
+            else:
+                stats['error_files'] += 1
+                stats['errors'].append({
+                    'file': filepath,
+                    'error': result.get('error', 'unknown')
+                })
+        
+        # Переименовываем папки если есть название
         if old_site_name and new_site_name:
             stats['renamed_directories'] = self.rename_directories(directory, old_site_name, new_site_name)
         
-        # Обходим все файлы в директории
-        for root, dirs, files in os.walk(directory):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-                stats['total_files'] += 1
-                
-                # Обрабатываем файл
-                result = self.process_file(filepath, old_domain, new_domain, old_site_name, new_site_name)
-                
-                if result['success']:
-                    if result.get('error') == 'binary_file_skipped':
-                        stats['skipped_files'] += 1
-                    else:
-                        stats['processed_files'] += 1
-                        stats['total_replacements'] += result['replacements']
-                        stats['total_name_replacements'] += result.get('name_replacements', 0)
-                else:
-                    stats['error_files'] += 1
-                    stats['errors'].append({
-                        'file': filepath,
-                        'error': result.get('error', 'unknown')
-                    })
-        
         return stats
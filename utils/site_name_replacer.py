@@ -1,13 +1,49 @@
 import re
 import os
-from typing import Optional, List, Tuple
-from collections import Counter
-from charset_normalizer import from_path
+from typing import Optional, List, Tuple, Dict
+
+from .text_decoding import decode_text
 
 
 class SiteNameReplacer:
     """Класс для определения и замены названий сайта"""
     
+    # Сканирование останавливается, когда у лидера (с бонусом за домен) столько очков
+    SITE_NAME_EARLY_EXIT_SCORE = 1000
+    
+    # Сколько текстовых файлов просматривается при поиске названия не более
+    SITE_NAME_MAX_FILES = 200
+    
+    # Страницы просматриваются первыми - <title> и og:site_name обычно в них
+    _PAGE_EXTENSIONS = ('.html', '.htm', '.php')
+    
+    # Бонус кандидату, совпадающему с именем домена
+    DOMAIN_MATCH_BONUS = 500
+    
+    # Известные части составных названий (порядок важен - первая подходящая часть выигрывает)
+    _COMMON_PARTS = (
+        'bio', 'vita', 'pure', 'care', 'health', 'life', 'well', 'zen',
+        'slim', 'fit', 'pro', 'max', 'neo', 'air', 'sun', 'lux', 'nova',
+        'heal', 'medz', 'nutr', 'opti', 'rise', 'wave', 'zest', 'flex',
+        'glow', 'herb', 'leaf', 'trim', 'calm', 'peak', 'zone', 'core'
+    )
+    
+    # Сколько названий, сгенерированных из доменов, хранится (при переполнении очищается)
+    SITE_NAME_CACHE_SIZE = 256
+    
+    # Сколько выражений для замены названия хранится (при переполнении очищается)
+    NAME_PATTERN_CACHE_SIZE = 32
+    
+    # Общие слова, которые не являются названием (создаются один раз, а не на каждое совпадение)
+    _GENERIC_WORDS = frozenset({
+        'home', 'index', 'main', 'page', 'site', 'website', 'welcome',
+        'test', 'demo', 'example', 'untitled', 'document', 'new page',
+        'loading', 'error', '404', '403', '500'
+    })
+    
+    # lower() не укорачивает строку: имя длиннее самого длинного общего слова общим не бывает
+    _GENERIC_MAX_LENGTH = max(map(len, _GENERIC_WORDS))
+    
     def __init__(self):
         """Инициализация"""
         self.text_extensions = {
@@ -15,11 +51,33 @@ class SiteNameReplacer:
             '.json', '.xml', '.sql', '.conf', '.config',
             '.htaccess', '.env', '.ini', '.yaml', '.yml'
         }
+        
+        # Паттерны для поиска названия с приоритетами
+        flags = re.IGNORECASE | re.MULTILINE
+        self.priority_patterns = [
+            (re.compile(r'<title>([^<|]+)', flags), 100),  # <title>Название</title> или <title>Название | ...</title>
+            (re.compile(r'<meta\s+property=["\']og:site_name["\']\s+content=["\']([^"\']+)', flags), 90),
+            (re.compile(r'<meta\s+name=["\']application-name["\']\s+content=["\']([^"\']+)', flags), 85),
+            (re.compile(r'["\']blogname["\']\s*[=:]\s*["\']([^"\']+)', flags), 70),
+            (re.compile(r'["\']site_title["\']\s*[=:]\s*["\']([^"\']+)', flags), 70),
+            (re.compile(r'<h1[^>]*>([^<]+)</h1>', flags), 50),
+        ]
+        self._tagline_re = re.compile(r'\s*[\|\-–—]\s*.*$')
+        
+        # Названия, сгенерированные из доменов: домен -> название
+        self._site_name_cache: Dict[str, str] = {}
+        
+        # Выражения замены названия: (старое, новое название) -> (выражение, замены вариантов)
+        self._name_pattern_cache: Dict[Tuple[str, str], tuple] = {}
     
     def detect_site_name(self, directory: str, domain_hint: Optional[str] = None) -> Optional[str]:
         """
         Определение названия сайта из файлов
         
+        Сначала просматриваются страницы (HTML/PHP), затем остальные файлы.
+        Просмотр прекращается, когда лидер набрал SITE_NAME_EARLY_EXIT_SCORE
+        (с учетом бонуса за совпадение с доменом), или после SITE_NAME_MAX_FILES файлов.
+        
         Args:
             directory: директория с файлами сайта
             domain_hint: подсказка - домен сайта (для фильтрации)
@@ -27,57 +85,109 @@ class SiteNameReplacer:
         Returns:
             Название сайта или None
         """
-        candidates = Counter()
+        candidates: Dict[str, int] = {}
+        domain_name = domain_hint.split('.')[0].lower() if domain_hint else None
         
-        # Паттерны для поиска названия с приоритетами
-        priority_patterns = [
-            (r'<title>([^<|]+)', 100),  # <title>Название</title> или <title>Название | ...</title>
-            (r'<meta\s+property=["\']og:site_name["\']\s+content=["\']([^"\']+)', 90),
-            (r'<meta\s+name=["\']application-name["\']\s+content=["\']([^"\']+)', 85),
-            (r'["\']blogname["\']\s*[=:]\s*["\']([^"\']+)', 70),
-            (r'["\']site_title["\']\s*[=:]\s*["\']([^"\']+)', 70),
-            (r'<h1[^>]*>([^<]+)</h1>', 50),
-        ]
+        # Страницы вперед, в остальном порядок обхода сохраняется (сортировка устойчивая)
+        filepaths = sorted(self._iter_text_files(directory),
+                           key=lambda path: not path.lower().endswith(self._PAGE_EXTENSIONS))
         
         # Собираем кандидатов из файлов
-        for root, dirs, files in os.walk(directory):
-            for filename in files:
-                _, ext = os.path.splitext(filename)
-                if ext.lower() not in self.text_extensions:
-                    continue
-                
-                filepath = os.path.join(root, filename)
-                content = self._read_file_safely(filepath)
-                
-                if not content:
-                    continue
+        for filepath in filepaths[:self.SITE_NAME_MAX_FILES]:
+            content = self._read_file_safely(filepath)
+            
+            if not content:
+                continue
+            
+            self.collect_site_name_candidates(content, candidates)
+            
+            # Лидер уже очевиден - остальные файлы не читаем
+            if candidates and max(
+                score + (self.DOMAIN_MATCH_BONUS if domain_name and self._matches_domain(name, domain_name) else 0)
+                for name, score in candidates.items()
+            ) >= self.SITE_NAME_EARLY_EXIT_SCORE:
+                break
+        
+        return self.choose_site_name(candidates, domain_hint)
+    
+    def _iter_text_files(self, directory: str):
+        """
+        Обход текстовых файлов через os.scandir в порядке os.walk
+        
+        Сначала файлы директории, затем поддиректории; ссылки на директории
+        не раскрываются. Тип записи берется из DirEntry без stat.
+        """
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    _, ext = os.path.splitext(entry.name)
+                    if ext.lower() in self.text_extensions:
+                        yield entry.path
+        except OSError:
+            # Как os.walk: нечитаемая директория пропускается
+            return
+        
+        for subdir in subdirs:
+            yield from self._iter_text_files(subdir)
+    
+    def collect_site_name_candidates(self, content: str, candidates: Dict[str, int]) -> None:
+        """
+        Поиск кандидатов на название сайта в содержимом одного файла
+        
+        Args:
+            content: текст файла
+            candidates: кандидаты с весами - dict или Counter (дополняется)
+        """
+        # Применяем паттерны
+        for pattern, weight in self.priority_patterns:
+            for match in pattern.findall(content):
+                name = match.strip()
+                # Очищаем от лишнего
+                name = self._tagline_re.sub('', name)  # Убираем " | слоган"
+                name = name.strip()
                 
-                # Применяем паттерны
-                for pattern, weight in priority_patterns:
-                    matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-                    for match in matches:
-                        name = match.strip()
-                        # Очищаем от лишнего
-                        name = re.sub(r'\s*[\|\-–—]\s*.*$', '', name)  # Убираем " | слоган"
-                        name = name.strip()
-                        
-                        # Фильтруем слишком короткие или длинные
-                        if 2 <= len(name) <= 50 and not self._is_generic_name(name):
-                            candidates[name] += weight
+                # Уже принятое название повторно не проверяем
+                if name in candidates:
+                    candidates[name] += weight
+                # Фильтруем слишком короткие или длинные
+                elif 2 <= len(name) <= 50 and not self._is_generic_name(name):
+                    candidates[name] = weight
+    
+    def choose_site_name(self, candidates: Dict[str, int], domain_hint: Optional[str] = None) -> Optional[str]:
+        """
+        Выбор названия сайта из собранных кандидатов
         
+        Args:
+            candidates: кандидаты с весами - dict или Counter
+            domain_hint: подсказка - домен сайта (для фильтрации)
+            
+        Returns:
+            Название сайта или None
+        """
         # Если есть подсказка домена - даем бонус совпадающим
         if domain_hint:
             domain_name = domain_hint.split('.')[0].lower()
             for name in list(candidates.keys()):
-                if domain_name in name.lower() or name.lower() in domain_name:
-                    candidates[name] += 500
+                if self._matches_domain(name, domain_name):
+                    candidates[name] += self.DOMAIN_MATCH_BONUS
         
         # Возвращаем самое частое
+        # (при равенстве - первый найденный, как у Counter.most_common)
         if candidates:
-            return candidates.most_common(1)[0][0]
+            return max(candidates, key=candidates.get)
         
         return None
     
+    def _matches_domain(self, name: str, domain_name: str) -> bool:
+        """Совпадает ли название с именем домена (одно содержит другое)"""
+        name_lower = name.lower()
+        return domain_name in name_lower or name_lower in domain_name
+    
     def generate_site_name_from_domain(self, domain: str) -> str:
         """
         Генерация названия сайта из домена
@@ -88,6 +198,15 @@ class SiteNameReplacer:
         Returns:
             Название сайта (например, HealCare)
         """
+        site_name = self._site_name_cache.get(domain)
+        if site_name is None:
+            if len(self._site_name_cache) >= self.SITE_NAME_CACHE_SIZE:
+                self._site_name_cache.clear()
+            site_name = self._site_name_cache[domain] = self._site_name_from_domain(domain)
+        return site_name
+    
+    def _site_name_from_domain(self, domain: str) -> str:
+        """Генерация названия сайта из домена без кэша"""
         # Извлекаем имя без зоны
         name = domain.split('.')[0]
         
@@ -105,26 +224,22 @@ class SiteNameReplacer:
     def _split_camelcase(self, text: str) -> List[str]:
         """Разбивает текст на части (пытается найти составные слова)"""
         # Простая эвристика: ищем известные префиксы/суффиксы
-        common_parts = [
-            'bio', 'vita', 'pure', 'care', 'health', 'life', 'well', 'zen',
-            'slim', 'fit', 'pro', 'max', 'neo', 'air', 'sun', 'lux', 'nova',
-            'heal', 'medz', 'nutr', 'opti', 'rise', 'wave', 'zest', 'flex',
-            'glow', 'herb', 'leaf', 'trim', 'calm', 'peak', 'zone', 'core'
-        ]
-        
+        common_parts = self._COMMON_PARTS
         text_lower = text.lower()
         
-        # Ищем совпадения в начале
-        for part in common_parts:
-            if text_lower.startswith(part) and len(text_lower) > len(part):
-                rest = text[len(part):]
-                return [text[:len(part)], rest]
+        # Ищем совпадения в начале (startswith с кортежем сразу отсеивает большинство имен)
+        if text_lower.startswith(common_parts):
+            for part in common_parts:
+                if text_lower.startswith(part) and len(text_lower) > len(part):
+                    rest = text[len(part):]
+                    return [text[:len(part)], rest]
         
         # Ищем совпадения в конце
-        for part in common_parts:
-            if text_lower.endswith(part) and len(text_lower) > len(part):
-                start = text[:-len(part)]
-                return [start, text[-len(part):]]
+        if text_lower.endswith(common_parts):
+            for part in common_parts:
+                if text_lower.endswith(part) and len(text_lower) > len(part):
+                    start = text[:-len(part)]
+                    return [start, text[-len(part):]]
         
         # Не нашли - возвращаем как есть
         return [text]
@@ -144,8 +259,23 @@ class SiteNameReplacer:
         if not old_name or not new_name:
             return text, 0
         
-        replacements = 0
-        modified_text = text
+        pattern, variant_map = self._site_name_pattern(old_name, new_name)
+        if pattern is None:
+            return text, 0
+        
+        # Все варианты заменяются за один проход; замена - по найденному варианту
+        return pattern.subn(lambda match: variant_map[match.group()], text)
+    
+    def _site_name_pattern(self, old_name: str, new_name: str) -> tuple:
+        """
+        Общее выражение для всех вариантов названия (компилируется один раз на пару названий)
+        
+        Returns:
+            (выражение или None, если заменять нечего; вариант -> замена)
+        """
+        cached = self._name_pattern_cache.get((old_name, new_name))
+        if cached is not None:
+            return cached
         
         # Создаем варианты в разных регистрах
         variants = [
@@ -155,44 +285,33 @@ class SiteNameReplacer:
             (old_name.capitalize(), new_name.capitalize()),  # Capitalize
         ]
         
-        # Убираем дубликаты
-        variants = list(set(variants))
-        
+        # Убираем дубликаты (при совпадении старого варианта выигрывает первый)
+        variant_map = {}
         for old_variant, new_variant in variants:
-            if old_variant == new_variant:
-                continue
-            
-            # Используем word boundaries для точной замены
-            pattern = re.compile(r'\b' + re.escape(old_variant) + r'\b')
-            modified_text, count = pattern.subn(new_variant, modified_text)
-            replacements += count
+            if old_variant != new_variant:
+                variant_map.setdefault(old_variant, new_variant)
         
-        return modified_text, replacements
+        pattern = None
+        if variant_map:
+            # Используем word boundaries для точной замены; длинные варианты - первыми
+            names = sorted(variant_map, key=len, reverse=True)
+            pattern = re.compile(r'\b(?:' + '|'.join(re.escape(name) for name in names) + r')\b')
+        
+        if len(self._name_pattern_cache) >= self.NAME_PATTERN_CACHE_SIZE:
+            self._name_pattern_cache.clear()
+        cached = self._name_pattern_cache[(old_name, new_name)] = (pattern, variant_map)
+        return cached
     
     def _read_file_safely(self, filepath: str) -> Optional[str]:
         """Безопасное чтение файла"""
         try:
-            result = from_path(filepath).best()
-            if result:
-                return str(result)
+            with open(filepath, 'rb') as f:
+                data = f.read()
         except Exception:
-            pass
-        
-        for encoding in ['utf-8', 'cp1251', 'latin1', 'ascii']:
-            try:
-                with open(filepath, 'r', encoding=encoding) as f:
-                    return f.read()
-            except Exception:
-                continue
+            return None
         
-        return None
+        return decode_text(data)
     
     def _is_generic_name(self, name: str) -> bool:
         """Проверка на общие слова которые не являются названием"""
-        generic_words = {
-            'home', 'index', 'main', 'page', 'site', 'website', 'welcome',
-            'test', 'demo', 'example', 'untitled', 'document', 'new page',
-            'loading', 'error', '404', '403', '500'
-        }
-        
-        return name.lower() in generic_words
+        return len(name) <= self._GENERIC_MAX_LENGTH and name.lower() in self._GENERIC_WORDS
@@ -0,0 +1,54 @@
+from typing import Optional, Tuple
+from charset_normalizer import from_bytes
+
+
+# Кодировки, которые пробуются, если статистическое определение не справилось
+FALLBACK_ENCODINGS = ('utf-8', 'cp1251', 'latin1', 'ascii', 'windows-1252')
+
+
+def decode_bytes(data: bytes, keep_bom: bool = True,
+                 normalize_newlines: bool = False) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Декодирование содержимого файла с определением кодировки
+
+    Args:
+        data: прочитанное содержимое файла
+        keep_bom: оставить BOM UTF-8 в тексте (нужно, если текст будет записан обратно)
+        normalize_newlines: в запасных кодировках привести переводы строк к '\\n' -
+            как при чтении файла в текстовом режиме
+
+    Returns:
+        (content, encoding) или (None, None) при ошибке
+    """
+    # Большинство файлов сайта в UTF-8 - статистическое определение не нужно.
+    # Нулевые байты бывают в UTF-16 без BOM, который формально тоже проходит как UTF-8.
+    if b'\x00' not in data:
+        try:
+            return data.decode('utf-8' if keep_bom else 'utf-8-sig'), 'utf-8'
+        except UnicodeDecodeError:
+            pass
+
+    # Пробуем определить кодировку
+    try:
+        result = from_bytes(data).best()
+        if result:
+            return str(result), result.encoding
+    except Exception:
+        pass
+
+    # Fallback - пробуем популярные кодировки
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            content = data.decode(encoding)
+        except Exception:
+            continue
+        if normalize_newlines:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content, encoding
+
+    return None, None
+
+
+def decode_text(data: bytes) -> Optional[str]:
+    """Декодирование содержимого файла только для поиска в нем (без BOM)"""
+    return decode_bytes(data, keep_bom=False, normalize_newlines=True)[0]